@@ -1,9 +1,16 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from PIL import Image
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
 import re
 import os
 import sys
+import hashlib
 import json
+import queue
+import shutil
+import threading
+import uuid
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import cv2
@@ -42,10 +49,35 @@ app.config['FACTURES_FOLDER'] = 'factures_sauvegardees'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg'}
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
+# File d'attente des traitements OCR (un fichier JSON par job)
+app.config['JOBS_FOLDER'] = 'jobs'
+# Threads qui traitent les jobs en arrière-plan
+app.config['OCR_JOB_WORKERS'] = 2
+# Import en masse : processus du pipeline, taille des lots enregistrés dans
+# factures.json, taille maximale de la requête et d'un fichier d'une archive
+app.config['BULK_WORKERS'] = max(1, (os.cpu_count() or 1) // 2)
+app.config['BULK_COMMIT_SIZE'] = 20
+app.config['BULK_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024
+app.config['BULK_MAX_FILE_SIZE'] = 16 * 1024 * 1024
+# Configurations PSM évaluées en parallèle pour une facture
+app.config['OCR_MAX_WORKERS'] = 3
+# Processus Tesseract simultanés au maximum, toutes requêtes confondues
+app.config['OCR_MAX_PROCESSES'] = os.cpu_count() or 1
+# Score (voir score_ocr) à partir duquel les autres configurations sont
+# annulées : les 5 champs trouvés avec une confiance moyenne d'au moins 50 %
+app.config['OCR_QUALITY_THRESHOLD'] = 5.5
+# Profil de prétraitement des images avant l'OCR (voir PREPROCESS_PROFILES)
+app.config['OCR_PROFILE'] = 'rapide'
+# Distance de Hamming maximale (sur 64 bits) entre les hachages perceptuels
+# de deux images pour les considérer comme la même facture re-scannée ou
+# recompressée. Deux factures d'un même modèle ont aussi des hachages
+# proches : une facture similaire est seulement signalée, l'OCR a lieu
+app.config['DUPLICATE_PHASH_DISTANCE'] = 10
 
 # Créer les dossiers nécessaires
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['FACTURES_FOLDER'], exist_ok=True)
+os.makedirs(app.config['JOBS_FOLDER'], exist_ok=True)
 
 # Configuration Tesseract - Détection automatique sur Windows
 def find_tesseract():
@@ -125,6 +157,9 @@ def verify_tesseract_installation():
 # Vérifier l'installation de Tesseract au démarrage
 TESSERACT_AVAILABLE = verify_tesseract_installation()
 
+# Borner le nombre de processus Tesseract lancés en parallèle
+pytesseract.set_max_processes(app.config['OCR_MAX_PROCESSES'])
+
 if not TESSERACT_AVAILABLE:
     print("\n" + "="*70)
     print("⚠️  ATTENTION: Tesseract OCR n'est pas installé ou introuvable!")
@@ -149,28 +184,83 @@ if not TESSERACT_AVAILABLE:
     print("   puis relancez l'application Flask.")
     print("="*70 + "\n")
 
+# Langues Tesseract selon l'écriture détectée par l'OSD. Les factures
+# mêlent souvent l'anglais à la langue locale, d'où le +eng
+LANGUES_PAR_ECRITURE = {
+    'Latin': 'fra+eng',
+    'Arabic': 'ara+eng',
+    'Cyrillic': 'rus+eng',
+    'Greek': 'ell+eng',
+    'Hebrew': 'heb+eng',
+    'Han': 'chi_sim+eng',
+    'Japanese': 'jpn+eng',
+    'Hangul': 'kor+eng',
+    'Devanagari': 'hin+eng',
+    'Thai': 'tha+eng',
+}
+LANGUE_PAR_DEFAUT = 'fra+eng'
+
+def installed_script_languages():
+    """Écritures dont les modèles sont installés, avec leurs langues"""
+    if not TESSERACT_AVAILABLE:
+        return {}
+    try:
+        installed = set(pytesseract.get_languages())
+    except Exception as e:
+        print(f"Impossible de lister les langues Tesseract: {e}")
+        return {}
+    return {
+        script: langs
+        for script, langs in LANGUES_PAR_ECRITURE.items()
+        if set(langs.split('+')) <= installed
+    }
+
+# Une écriture sans modèle installé garde la langue par défaut
+LANGUE_PAR_ECRITURE = installed_script_languages()
+
+def orient_image(img):
+    """Redresse l'image et choisit la langue grâce à une passe OSD (--psm 0)
+
+    L'OSD tourne sur une miniature en niveaux de gris : l'image pleine
+    résolution n'est tournée qu'une fois, et une seule langue est essayée
+    au lieu de fra+eng puis eng.
+    """
+    try:
+        img, osd = pytesseract.auto_rotate(img)
+    except Exception as e:
+        print(f"OSD impossible, image laissée telle quelle: {e}")
+        return img, LANGUE_PAR_DEFAUT
+    if osd is None:
+        return img, LANGUE_PAR_DEFAUT
+    return img, LANGUE_PAR_ECRITURE.get(osd.get('script'), LANGUE_PAR_DEFAUT)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def save_facture(invoice_data, annotated_filename, original_filename):
+# Plusieurs jobs peuvent enregistrer une facture en même temps
+factures_lock = threading.Lock()
+
+def save_facture(invoice_data, annotated_filename, original_filename,
+                 prints=None):
     """Sauvegarde une facture dans le système"""
-    facture_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-    
-    facture_info = {
-        'id': facture_id,
-        'date_creation': datetime.now().isoformat(),
-        'date_facture': invoice_data.get('date', ''),
-        'numero_facture': invoice_data.get('numero_facture', ''),
-        'fournisseur': invoice_data.get('fournisseur', ''),
-        'montant_ht': invoice_data.get('montant_ht', ''),
-        'montant_ttc': invoice_data.get('montant_ttc', ''),
-        'tva': invoice_data.get('tva', ''),
-        'devise': invoice_data.get('devise', 'EUR'),
-        'adresse': invoice_data.get('adresse', ''),
-        'annotated_image': annotated_filename,
-        'original_filename': original_filename
-    }
-    
+    return save_factures([
+        (invoice_data, annotated_filename, original_filename, prints)
+    ])[0]
+
+def save_factures(entries):
+    """Sauvegarde un lot de factures en une seule écriture de factures.json
+
+    entries : liste de (invoice_data, annotated_filename, original_filename,
+    prints), prints étant les empreintes du fichier (voir fingerprint) ou
+    None. Retourne les identifiants des factures, dans le même ordre.
+    """
+    with factures_lock:
+        try:
+            return _save_factures(entries)
+        finally:
+            fingerprint_index.invalidate()
+
+def _save_factures(entries):
     # Sauvegarder dans un fichier JSON
     factures_file = os.path.join(app.config['FACTURES_FOLDER'], 'factures.json')
     
@@ -183,21 +273,50 @@ def save_facture(invoice_data, annotated_filename, original_filename):
         except:
             factures = []
     
-    # Ajouter la nouvelle facture
-    factures.append(facture_info)
+    existing_ids = {facture.get('id') for facture in factures}
+    facture_ids = []
+    for invoice_data, annotated_filename, original_filename, prints in entries:
+        # Microsecondes : deux jobs peuvent se terminer dans la même seconde,
+        # et un suffixe pour les factures d'un même lot
+        facture_id = base_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        suffix = 1
+        while facture_id in existing_ids:
+            facture_id = f'{base_id}_{suffix}'
+            suffix += 1
+        existing_ids.add(facture_id)
+        
+        facture_info = {
+            'id': facture_id,
+            'date_creation': datetime.now().isoformat(),
+            'date_facture': invoice_data.get('date', ''),
+            'numero_facture': invoice_data.get('numero_facture', ''),
+            'fournisseur': invoice_data.get('fournisseur', ''),
+            'montant_ht': invoice_data.get('montant_ht', ''),
+            'montant_ttc': invoice_data.get('montant_ttc', ''),
+            'tva': invoice_data.get('tva', ''),
+            'devise': invoice_data.get('devise', 'EUR'),
+            'adresse': invoice_data.get('adresse', ''),
+            'annotated_image': annotated_filename,
+            'original_filename': original_filename
+        }
+        if prints:
+            facture_info.update(prints)
+        
+        # Ajouter la nouvelle facture
+        factures.append(facture_info)
+        facture_ids.append(facture_id)
+        
+        # Copier l'image annotée dans le dossier factures
+        source_path = os.path.join(app.config['UPLOAD_FOLDER'], annotated_filename)
+        dest_path = os.path.join(app.config['FACTURES_FOLDER'], annotated_filename)
+        if os.path.exists(source_path):
+            shutil.copy2(source_path, dest_path)
     
     # Sauvegarder
     with open(factures_file, 'w', encoding='utf-8') as f:
         json.dump(factures, f, ensure_ascii=False, indent=2)
     
-    # Copier l'image annotée dans le dossier factures
-    source_path = os.path.join(app.config['UPLOAD_FOLDER'], annotated_filename)
-    dest_path = os.path.join(app.config['FACTURES_FOLDER'], annotated_filename)
-    if os.path.exists(source_path):
-        import shutil
-        shutil.copy2(source_path, dest_path)
-    
-    return facture_id
+    return facture_ids
 
 def load_all_factures():
     """Charge toutes les factures sauvegardées"""
@@ -214,6 +333,11 @@ def load_all_factures():
 
 def delete_facture(facture_id):
     """Supprime une facture par son ID"""
+    # Les jobs peuvent enregistrer des factures au même moment
+    with factures_lock:
+        return _delete_facture(facture_id)
+
+def _delete_facture(facture_id):
     factures_file = os.path.join(app.config['FACTURES_FOLDER'], 'factures.json')
     
     if not os.path.exists(factures_file):
@@ -248,6 +372,7 @@ def delete_facture(facture_id):
             # Sauvegarder
             with open(factures_file, 'w', encoding='utf-8') as f:
                 json.dump(factures, f, ensure_ascii=False, indent=2)
+            fingerprint_index.invalidate()
             
             return True
         return False
@@ -255,6 +380,158 @@ def delete_facture(facture_id):
         print(f"Erreur lors de la suppression: {e}")
         return False
 
+def file_sha256(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def perceptual_hash(filepath):
+    """Hachage perceptuel (pHash) de l'image sur 64 bits, en hexadécimal
+
+    Basses fréquences de la DCT d'une miniature 32x32 en niveaux de gris,
+    comparées à leur médiane : le hachage résiste à la recompression, au
+    redimensionnement et au bruit d'un nouveau scan. Un JPEG est décodé
+    directement au 1/8 de sa taille. None si l'image est illisible.
+    """
+    gray = cv2.imread(filepath, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()
+    # Le coefficient continu (luminosité moyenne) n'entre pas dans la médiane
+    return np.packbits(low > np.median(low[1:])).tobytes().hex()
+
+def fingerprint(filepath):
+    """Empreintes d'un fichier uploadé, enregistrées avec sa facture"""
+    return {'sha256': file_sha256(filepath), 'phash': perceptual_hash(filepath)}
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+class FingerprintIndex:
+    """Empreintes des factures enregistrées, pour détecter les doublons
+
+    Construit à partir de factures.json, et reconstruit quand il est réécrit
+    (invalidate) ou modifié par un autre processus (date et taille).
+    """
+
+    def __init__(self):
+        self._stamp = None
+        self._by_sha256 = {}
+        self._phashes = []
+
+    def invalidate(self):
+        self._stamp = None
+
+    def _refresh(self):
+        factures_file = os.path.join(app.config['FACTURES_FOLDER'], 'factures.json')
+        try:
+            stat = os.stat(factures_file)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = ()
+        if stamp == self._stamp:
+            return
+        self._by_sha256 = {}
+        self._phashes = []
+        for facture in load_all_factures():
+            if facture.get('sha256'):
+                self._by_sha256.setdefault(facture['sha256'], facture)
+            if facture.get('phash'):
+                self._phashes.append((int(facture['phash'], 16), facture))
+        self._stamp = stamp
+
+    def find(self, prints):
+        """Facture déjà enregistrée pour ces empreintes : (facture, type,
+        distance), type étant 'identique' (mêmes octets) ou 'similaire'
+        (même image à DUPLICATE_PHASH_DISTANCE près), ou None
+        """
+        with factures_lock:
+            self._refresh()
+            facture = self._by_sha256.get(prints['sha256'])
+            if facture is not None:
+                return facture, 'identique', 0
+            if not prints.get('phash'):
+                return None
+            phash = int(prints['phash'], 16)
+            best = None
+            for other, facture in self._phashes:
+                distance = hamming_distance(phash, other)
+                if distance <= app.config['DUPLICATE_PHASH_DISTANCE'] and (
+                        best is None or distance < best[2]):
+                    best = (facture, 'similaire', distance)
+            return best
+
+fingerprint_index = FingerprintIndex()
+
+def duplicate_info(facture, kind, distance):
+    """Lien vers une facture enregistrée identique ou similaire (voir find)"""
+    annotated_image = facture.get('annotated_image')
+    return {
+        'type': kind,
+        'distance': distance,
+        'facture_id': facture['id'],
+        'annotated_image': f'/factures/{annotated_image}' if annotated_image else None,
+        'date_creation': facture.get('date_creation'),
+        'original_filename': facture.get('original_filename')
+    }
+
+def duplicate_response(facture, kind, distance):
+    """Réponse à l'upload d'une facture déjà enregistrée, sans nouvel OCR"""
+    duplicate = duplicate_info(facture, kind, distance)
+    return {
+        'success': True,
+        'duplicate': duplicate,
+        'facture_id': facture['id'],
+        'annotated_image': duplicate['annotated_image'],
+        'data': {
+            'fournisseur': facture.get('fournisseur', ''),
+            'date': facture.get('date_facture', ''),
+            'numero_facture': facture.get('numero_facture', ''),
+            'montant_ht': facture.get('montant_ht', ''),
+            'montant_ttc': facture.get('montant_ttc', ''),
+            'tva': facture.get('tva', ''),
+            'devise': facture.get('devise', 'EUR'),
+            'adresse': facture.get('adresse', '')
+        }
+    }
+
+def ocr_data_from_tsv(tsv):
+    """Convertit la sortie TSV de Tesseract en liste de mots avec coordonnées"""
+    ocr_data_dict = pytesseract.pytesseract.file_to_dict(tsv, '\t', -1)
+    ocr_data = []
+    n_boxes = len(ocr_data_dict.get('text', []))
+    for i in range(n_boxes):
+        if int(ocr_data_dict['conf'][i]) > 0:  # Ignorer les confidences 0
+            ocr_data.append({
+                'text': ocr_data_dict['text'][i],
+                'left': ocr_data_dict['left'][i],
+                'top': ocr_data_dict['top'][i],
+                'width': ocr_data_dict['width'][i],
+                'height': ocr_data_dict['height'][i],
+                'conf': ocr_data_dict['conf'][i]
+            })
+    return ocr_data
+
+# Champs dont la présence mesure la complétude de l'extraction
+CHAMPS_ESSENTIELS = ('numero_facture', 'date', 'montant_ttc', 'montant_ht', 'tva')
+
+def score_ocr(outputs):
+    """Note une configuration OCR à partir de ses sorties (texte, TSV)
+
+    Un point par champ essentiel extrait, plus la confiance moyenne des mots
+    ramenée entre 0 et 1 pour départager les configurations.
+    """
+    text, tsv = outputs
+    ocr_data = ocr_data_from_tsv(tsv)
+    data = extract_invoice_data(text, ocr_data)
+    found = sum(1 for champ in CHAMPS_ESSENTIELS if data.get(champ))
+    confs = [float(word['conf']) for word in ocr_data if str(word['text']).strip()]
+    mean_conf = sum(confs) / len(confs) / 100 if confs else 0
+    return found + mean_conf
+
 def extract_invoice_data(text, ocr_data=None):
     """Extrait les informations structurées d'une facture depuis le texte OCR"""
     data = {
@@ -551,9 +828,12 @@ def find_text_coordinates(search_text, ocr_data):
     
     return None
 
-def draw_annotations_on_image(img, invoice_data):
-    """Dessine des encadrés sur l'image pour les informations détectées"""
-    annotated_img = img.copy()
+def draw_annotations_on_image(img, invoice_data, copy=True):
+    """Dessine des encadrés sur l'image pour les informations détectées
+
+    Avec copy=False, dessine directement sur img (dernière étape qui l'utilise).
+    """
+    annotated_img = img.copy() if copy else img
     h, w = annotated_img.shape[:2]
     
     # Couleurs pour chaque type d'information
@@ -786,6 +1066,776 @@ def delete_facture_api(facture_id):
     else:
         return jsonify({'error': 'Facture non trouvée'}), 404
 
+class InvoiceProcessingError(Exception):
+    """Erreur de traitement d'une facture, avec le message destiné à l'utilisateur"""
+
+TESSERACT_NOT_FOUND_MESSAGE = (
+    "Tesseract OCR n'est pas installé ou introuvable.\n\n"
+    "📥 INSTALLATION REQUISE:\n\n"
+    "Méthode 1 - Installation manuelle:\n"
+    "1. Téléchargez: https://github.com/UB-Mannheim/tesseract/wiki\n"
+    "2. Installez et cochez 'Add to PATH'\n"
+    "3. Sélectionnez French (fra) et English (eng)\n"
+    "4. Redémarrez l'application\n\n"
+    "Méthode 2 - Via winget:\n"
+    "winget install --id UB-Mannheim.TesseractOCR\n\n"
+    "Méthode 3 - Via Chocolatey:\n"
+    "choco install tesseract\n\n"
+    "Après installation, redémarrez l'application Flask."
+)
+
+class InvoiceImage:
+    """Facture décodée une seule fois, partagée par les étapes du pipeline
+
+    pixels est le seul tampon pleine résolution (BGR, comme OpenCV). Les
+    images dérivées ne sont calculées que si une étape les demande, et
+    release() les libère dès que l'étape est terminée.
+    """
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self._derived = {}
+
+    @classmethod
+    def read(cls, filepath):
+        pixels = cv2.imread(filepath)
+        if pixels is None:
+            raise InvoiceProcessingError("Impossible de lire l'image")
+        return cls(pixels)
+
+    def replace(self, pixels):
+        """Remplace le tampon (image redressée) et oublie les images dérivées"""
+        self.pixels = pixels
+        self._derived.clear()
+
+    def release(self, *names):
+        """Libère les images dérivées données, ou toutes"""
+        for name in names or list(self._derived):
+            self._derived.pop(name, None)
+
+    def _get(self, name, compute):
+        if name not in self._derived:
+            self._derived[name] = compute()
+        return self._derived[name]
+
+    @property
+    def rgb(self):
+        """Copie RGB contiguë du tampon, faite une fois pour tous les OCR
+
+        Une vue inversée (pixels[:, :, ::-1]) n'est pas contiguë :
+        pytesseract la recopierait à chaque écriture.
+        """
+        return self._get(
+            'rgb', lambda: np.ascontiguousarray(self.pixels[:, :, ::-1])
+        )
+
+    @property
+    def gray(self):
+        return self._get(
+            'gray', lambda: cv2.cvtColor(self.pixels, cv2.COLOR_BGR2GRAY)
+        )
+
+    def preprocessed(self, profile):
+        """Image prétraitée selon le profil, et sa matrice (voir preprocess)"""
+        return self._get(('profil', profile), lambda: preprocess(self, profile))
+
+# Prétraitement avant l'OCR. Chaque étape prend une image (BGR ou niveaux de
+# gris) et retourne (image, matrice) : la matrice affine 3x3 qui envoie les
+# coordonnées de l'entrée dans celles de la sortie, ou None si elles ne
+# changent pas. Les mots trouvés par Tesseract sont ainsi replacés sur
+# l'image d'origine pour les annotations.
+
+# Largeur visée : une page A4 entre 150 et 300 DPI
+PREPROCESS_MIN_WIDTH = 1240
+PREPROCESS_MAX_WIDTH = 2480
+# En dessous, l'inclinaison n'est pas corrigée ; au-dessus, ce n'est pas
+# une inclinaison mais une erreur de mesure (l'OSD a déjà redressé l'image)
+DESKEW_MIN_ANGLE = 0.3
+DESKEW_MAX_ANGLE = 10
+# Marge laissée autour du texte par le recadrage
+CROP_MARGIN = 20
+
+def _gray(img):
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def _ink(gray):
+    """Masque des pixels d'encre (seuil d'Otsu inversé)"""
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return ink
+
+def grayscale_stage(img):
+    return _gray(img), None
+
+def scale_stage(img):
+    """Ramène la largeur entre PREPROCESS_MIN_WIDTH et PREPROCESS_MAX_WIDTH"""
+    h, w = img.shape[:2]
+    if w > PREPROCESS_MAX_WIDTH:
+        new_w, interpolation = PREPROCESS_MAX_WIDTH, cv2.INTER_AREA
+    elif w < PREPROCESS_MIN_WIDTH:
+        new_w, interpolation = PREPROCESS_MIN_WIDTH, cv2.INTER_CUBIC
+    else:
+        return img, None
+    new_h = max(1, round(h * new_w / w))
+    img = cv2.resize(img, (new_w, new_h), interpolation=interpolation)
+    return img, np.diag([new_w / w, new_h / h, 1.0])
+
+def deskew_stage(img):
+    """Corrige la légère inclinaison d'une photo ou d'un scan"""
+    points = cv2.findNonZero(_ink(_gray(img)))
+    if points is None:
+        return img, None
+    # Angle du rectangle qui englobe l'encre : dans [-90, 0) ou [0, 90)
+    # selon la version d'OpenCV, ramené dans [-45, 45]
+    angle = cv2.minAreaRect(points)[2]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if not DESKEW_MIN_ANGLE <= abs(angle) <= DESKEW_MAX_ANGLE:
+        return img, None
+    h, w = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    img = cv2.warpAffine(img, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                         borderMode=cv2.BORDER_REPLICATE)
+    return img, np.vstack([matrix, [0, 0, 1]])
+
+def denoise_stage(img):
+    """Filtre médian 3x3 : enlève le grain sans empâter les caractères"""
+    return cv2.medianBlur(img, 3), None
+
+def threshold_stage(img):
+    """Seuil adaptatif, pour renforcer le contraste"""
+    return cv2.adaptiveThreshold(
+        _gray(img), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 11, 2
+    ), None
+
+def crop_stage(img):
+    """Coupe les bords sans texte (fond, ombres, bord du scanner)"""
+    ink = _ink(_gray(img))
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if not len(rows) or not len(cols):
+        return img, None
+    h, w = img.shape[:2]
+    top = max(0, rows[0] - CROP_MARGIN)
+    bottom = min(h, rows[-1] + 1 + CROP_MARGIN)
+    left = max(0, cols[0] - CROP_MARGIN)
+    right = min(w, cols[-1] + 1 + CROP_MARGIN)
+    if (top, bottom, left, right) == (0, h, 0, w):
+        return img, None
+    matrix = np.array([[1, 0, -left], [0, 1, -top], [0, 0, 1]], dtype=float)
+    return img[top:bottom, left:right], matrix
+
+PREPROCESS_STAGES = {
+    'gris': grayscale_stage,
+    'echelle': scale_stage,
+    'redressement': deskew_stage,
+    'debruitage': denoise_stage,
+    'seuil': threshold_stage,
+    'recadrage': crop_stage,
+}
+
+# Profils de prétraitement : les étapes appliquées, dans l'ordre. Le
+# benchmark (benchmark_profils.py) mesure le temps et la qualité
+# d'extraction de chacun
+PREPROCESS_PROFILES = {
+    'brut': (),
+    'rapide': ('gris', 'echelle'),
+    'precis': ('gris', 'echelle', 'redressement', 'debruitage', 'seuil',
+               'recadrage'),
+}
+
+def preprocess(image, profile):
+    """Applique les étapes du profil à une InvoiceImage
+
+    Retourne (image pour Tesseract, matrice des coordonnées d'origine vers
+    celles de cette image, ou None). Les images intermédiaires sont libérées
+    au fil des étapes ; sans étape, c'est la copie RGB partagée (voir rgb).
+    L'image retournée est contiguë, pour que pytesseract l'écrive sans la
+    recopier.
+    """
+    stages = PREPROCESS_PROFILES[profile]
+    if not stages:
+        return image.rgb, None
+    img = image.gray if stages[0] == 'gris' else image.pixels
+    matrix = None
+    for name in stages[stages[0] == 'gris':]:
+        img, stage_matrix = PREPROCESS_STAGES[name](img)
+        if stage_matrix is not None:
+            matrix = stage_matrix if matrix is None else stage_matrix @ matrix
+    if img is image.pixels:
+        return image.rgb, matrix
+    if img.ndim == 3:
+        img = img[:, :, ::-1]
+    # Le recadrage et l'inversion des canaux donnent des vues
+    return np.ascontiguousarray(img), matrix
+
+def boxes_to_original(ocr_data, matrix):
+    """Replace les boîtes des mots sur l'image d'origine"""
+    if matrix is None or not ocr_data:
+        return ocr_data
+    boxes = np.array([
+        [int(word['left']), int(word['top']), int(word['width']),
+         int(word['height'])]
+        for word in ocr_data
+    ], dtype=float)
+    left, top = boxes[:, 0], boxes[:, 1]
+    right, bottom = left + boxes[:, 2], top + boxes[:, 3]
+    # Les quatre coins de chaque boîte, en coordonnées homogènes
+    corners = np.stack([
+        np.stack([left, top]), np.stack([right, top]),
+        np.stack([left, bottom]), np.stack([right, bottom]),
+    ])
+    inverse = np.linalg.inv(matrix)
+    xs = (inverse[0, 0] * corners[:, 0] + inverse[0, 1] * corners[:, 1]
+          + inverse[0, 2])
+    ys = (inverse[1, 0] * corners[:, 0] + inverse[1, 1] * corners[:, 1]
+          + inverse[1, 2])
+    new_left, new_top = xs.min(axis=0), ys.min(axis=0)
+    new_width, new_height = xs.max(axis=0) - new_left, ys.max(axis=0) - new_top
+    return [
+        {**word, 'left': int(round(l)), 'top': int(round(t)),
+         'width': int(round(w)), 'height': int(round(h))}
+        for word, l, t, w, h in zip(
+            ocr_data, new_left, new_top, new_width, new_height
+        )
+    ]
+
+def run_ocr(image, lang, profile=None):
+    """OCR d'une InvoiceImage prétraitée selon le profil
+
+    profile vaut OCR_PROFILE par défaut. Retourne (texte, mots avec leurs
+    coordonnées sur l'image d'origine, ou None), ou lève
+    InvoiceProcessingError.
+    """
+    profile = profile or app.config['OCR_PROFILE']
+    ocr_data = None
+    try:
+        ocr_image, matrix = image.preprocessed(profile)
+        
+        # Essayer plusieurs configurations PSM pour de meilleurs résultats
+        # (la langue vient de l'OSD, inutile de réessayer en anglais seul)
+        configs_to_try = [
+            ('--psm 6', lang),  # Bloc uniforme
+            ('--psm 3', lang),  # Automatique
+            ('--psm 11', lang), # Texte dense
+        ]
+        
+        full_text = None
+        best_tsv = None
+        
+        # Toutes les configurations tournent en parallèle, texte et
+        # boîtes des mots en une seule passe chacune. La mieux notée
+        # (champs extraits, confiance) est gardée, et les autres sont
+        # annulées dès qu'une atteint le seuil de qualité
+        try:
+            best = pytesseract.ocr_best_of(
+                ocr_image,
+                configs_to_try,
+                scorer=score_ocr,
+                extension=['txt', 'tsv'],
+                max_workers=app.config['OCR_MAX_WORKERS'],
+                threshold=app.config['OCR_QUALITY_THRESHOLD'],
+            )
+            full_text, best_tsv = best.output
+        except Exception as e:
+            print(f"Aucune configuration OCR n'a abouti: {e}")
+        
+        # Si aucune configuration n'a fonctionné, utiliser la dernière tentative
+        if not full_text:
+            full_text, best_tsv = pytesseract.run_and_get_multiple_output(
+                ocr_image,
+                extensions=['txt', 'tsv'],
+                lang=lang,
+                config='--psm 6'
+            )
+        
+        # Coordonnées des mots pour les annotations, issues de la même
+        # passe que le texte et replacées sur l'image d'origine
+        try:
+            ocr_data = boxes_to_original(ocr_data_from_tsv(best_tsv), matrix)
+        except Exception as e:
+            print(f"Erreur lors de la récupération des coordonnées OCR: {e}")
+            ocr_data = None
+            
+    except pytesseract.TesseractNotFoundError:
+        raise InvoiceProcessingError(TESSERACT_NOT_FOUND_MESSAGE)
+    except Exception as ocr_error:
+        # En cas d'erreur OCR, essayer avec l'image originale
+        try:
+            full_text = pytesseract.image_to_string(
+                image.rgb,
+                lang=lang,
+                config='--psm 6'
+            )
+        except:
+            raise InvoiceProcessingError(f'Erreur OCR: {str(ocr_error)}')
+    return full_text, ocr_data
+
+def process_invoice(filepath, filename, progress=lambda stage: None,
+                    prints=None):
+    """Traite une facture uploadée : OCR, extraction, annotation et sauvegarde
+
+    progress(stage) est appelé au début de chaque étape (voir JOB_STAGES), et
+    prints (voir fingerprint) est enregistré avec la facture. Retourne le
+    résultat destiné au client, ou lève InvoiceProcessingError. Le fichier
+    uploadé est supprimé dans tous les cas.
+    """
+    invoice_data, annotated_filename = analyze_invoice(filepath, filename, progress)
+    
+    # Sauvegarder la facture dans le système
+    progress('sauvegarde')
+    facture_id = save_facture(invoice_data, annotated_filename, filename, prints)
+    
+    return {
+        'success': True,
+        'data': invoice_data,
+        'annotated_image': f'/uploads/{annotated_filename}',
+        'facture_id': facture_id
+    }
+
+def analyze_invoice(filepath, filename, progress=lambda stage: None,
+                    profile=None):
+    """Lecture, OCR, extraction et annotation d'une facture, sans l'enregistrer
+
+    profile est le profil de prétraitement (OCR_PROFILE par défaut).
+    Retourne (invoice_data, annotated_filename), ou lève
+    InvoiceProcessingError. Tourne aussi dans les processus de l'import en
+    masse. Le fichier est supprimé dans tous les cas.
+    """
+    try:
+        # Décoder l'image une seule fois, pour toutes les étapes
+        progress('lecture')
+        image = InvoiceImage.read(filepath)
+        
+        # Redresser les photos prises de travers et choisir la langue
+        progress('orientation')
+        pixels, lang = orient_image(image.pixels)
+        image.replace(pixels)
+        del pixels
+        
+        # Prétraitement du profil choisi, puis OCR
+        progress('ocr')
+        full_text, ocr_data = run_ocr(image, lang, profile)
+        
+        # Les images dérivées pour l'OCR ne servent plus
+        image.release()
+        
+        # Extraire les données structurées avec coordonnées
+        progress('extraction')
+        invoice_data = extract_invoice_data(full_text, ocr_data)
+        
+        # Dessiner les annotations sur l'image originale : dernière étape qui
+        # utilise le tampon, inutile de le copier
+        progress('annotation')
+        annotated_img = draw_annotations_on_image(image.pixels, invoice_data, copy=False)
+        
+        # Sauvegarder l'image annotée (suffixe aléatoire : un import en masse
+        # peut contenir plusieurs fichiers de même nom)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        annotated_filename = f'annotated_{timestamp}_{uuid.uuid4().hex[:8]}_{filename}'
+        annotated_filepath = os.path.join(app.config['UPLOAD_FOLDER'], annotated_filename)
+        cv2.imwrite(annotated_filepath, annotated_img)
+        
+        return invoice_data, annotated_filename
+    except InvoiceProcessingError:
+        raise
+    except Exception as e:
+        raise InvoiceProcessingError(f'Erreur lors du traitement: {str(e)}')
+    finally:
+        # Nettoyer le fichier uploadé (garder l'annotée)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+# ---------------------------------------------------------------------------
+# Jobs OCR en arrière-plan
+#
+# /upload enregistre le fichier, crée un job et répond 202 tout de suite.
+# Chaque job est un fichier JSON dans JOBS_FOLDER : c'est la file d'attente
+# sur disque, relue au démarrage pour reprendre les jobs interrompus. Elle
+# suppose un seul processus applicatif (les workers sont des threads).
+# ---------------------------------------------------------------------------
+
+# Étapes d'un job, dans l'ordre, pour le suivi de la progression
+JOB_STAGES = ('en_attente', 'lecture', 'orientation', 'ocr', 'extraction',
+              'annotation', 'sauvegarde', 'termine')
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+job_queue = queue.Queue()
+# Réveille les flux SSE à chaque changement d'état d'un job
+jobs_condition = threading.Condition()
+jobs_version = 0
+job_workers_lock = threading.Lock()
+job_workers_started = False
+# Jobs en cours de traitement dans ce processus
+running_jobs = set()
+
+def job_path(job_id):
+    return os.path.join(app.config['JOBS_FOLDER'], f'{job_id}.json')
+
+def load_job(job_id):
+    """Charge un job depuis le disque, ou None s'il n'existe pas"""
+    if not JOB_ID_PATTERN.match(job_id):
+        return None
+    try:
+        with open(job_path(job_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def update_job(job, **changes):
+    """Met à jour un job et l'écrit sur disque de façon atomique"""
+    global jobs_version
+    job.update(changes)
+    job['updated'] = datetime.now().isoformat()
+    path = job_path(job['id'])
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    with jobs_condition:
+        jobs_version += 1
+        jobs_condition.notify_all()
+
+# Champs internes d'un job, jamais renvoyés au client (chemins locaux)
+JOB_PRIVATE_FIELDS = {'filepath', 'bulk_dir', 'inputs', 'fingerprint'}
+
+def job_public(job):
+    """État d'un job tel que renvoyé au client (sans chemin local)"""
+    return {key: value for key, value in job.items() if key not in JOB_PRIVATE_FIELDS}
+
+def create_job(job_id, filepath, filename, prints=None,
+               possible_duplicate=None):
+    """Crée un job en attente et le place dans la file
+
+    possible_duplicate : facture enregistrée similaire (voir duplicate_info).
+    """
+    job = {
+        'id': job_id,
+        'status': 'en_attente',
+        'stage': 'en_attente',
+        'progress': 0,
+        'filename': filename,
+        'filepath': filepath,
+        'fingerprint': prints,
+        'possible_duplicate': possible_duplicate,
+        'created': datetime.now().isoformat(),
+        'result': None,
+        'error': None
+    }
+    # La file sur disque doit être relue avant qu'un nouveau job y entre
+    start_job_workers()
+    update_job(job)
+    job_queue.put(job_id)
+    return job
+
+def create_bulk_job(job_id, bulk_dir, inputs, report):
+    """Crée un job d'import en masse et le place dans la file
+
+    inputs : liste de (nom d'origine, chemin) des images et des ZIP reçus ;
+    report : entrées déjà en erreur (fichiers refusés à l'upload).
+    """
+    job = {
+        'id': job_id,
+        'kind': 'bulk',
+        'status': 'en_attente',
+        'stage': 'en_attente',
+        'progress': 0,
+        'bulk_dir': bulk_dir,
+        'inputs': inputs,
+        'created': datetime.now().isoformat(),
+        'total': None,
+        # Fichiers refusés à l'upload : dans le rapport, pas dans inputs
+        'refused': len(report),
+        'report': report,
+        'result': None,
+        'error': None
+    }
+    # La file sur disque doit être relue avant qu'un nouveau job y entre
+    start_job_workers()
+    update_job(job)
+    job_queue.put(job_id)
+    return job
+
+def run_job(job_id):
+    """Traite un job de la file et enregistre son résultat"""
+    with job_workers_lock:
+        if job_id in running_jobs:
+            return
+        running_jobs.add(job_id)
+    try:
+        _run_job(job_id)
+    finally:
+        with job_workers_lock:
+            running_jobs.discard(job_id)
+
+def _run_job(job_id):
+    job = load_job(job_id)
+    if job is None or job['status'] not in ('en_attente', 'en_cours'):
+        return
+    if job.get('kind') == 'bulk':
+        run_bulk_job(job)
+        return
+    
+    def progress(stage):
+        update_job(
+            job,
+            status='en_cours',
+            stage=stage,
+            progress=JOB_STAGES.index(stage) / (len(JOB_STAGES) - 1)
+        )
+    
+    try:
+        result = process_invoice(job['filepath'], job['filename'], progress,
+                                 job.get('fingerprint'))
+    except InvoiceProcessingError as e:
+        update_job(job, status='erreur', error=str(e))
+    except Exception as e:
+        update_job(job, status='erreur', error=f'Erreur lors du traitement: {str(e)}')
+    else:
+        update_job(job, status='termine', stage='termine', progress=1, result=result)
+
+def iter_bulk_inputs(job, done=()):
+    """Fichiers d'un import en masse : (nom, chemin, erreur)
+
+    Les membres des ZIP sont extraits sur disque un par un, au fur et à
+    mesure que le pipeline les demande, sans charger l'archive en mémoire.
+    Les noms déjà dans done (reprise après redémarrage) sont sautés.
+    """
+    for index, (name, path) in enumerate(job['inputs']):
+        if not name.lower().endswith('.zip'):
+            if name not in done:
+                yield name, path, None
+            continue
+        
+        try:
+            archive = zipfile.ZipFile(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            if name not in done:
+                yield name, None, f'Archive ZIP illisible: {e}'
+            continue
+        
+        with archive:
+            for number, info in enumerate(archive.infolist()):
+                member = f'{name}/{info.filename}'
+                if info.is_dir() or member in done:
+                    continue
+                if not allowed_file(info.filename):
+                    yield member, None, 'Type de fichier non autorisé'
+                    continue
+                if info.file_size > app.config['BULK_MAX_FILE_SIZE']:
+                    yield member, None, 'Fichier trop volumineux'
+                    continue
+                
+                filename = secure_filename(os.path.basename(info.filename)) or 'facture'
+                filepath = os.path.join(job['bulk_dir'], f'{index}_{number}_{filename}')
+                try:
+                    with archive.open(info) as source, open(filepath, 'wb') as target:
+                        shutil.copyfileobj(source, target, 1024 * 1024)
+                except (OSError, zipfile.BadZipFile) as e:
+                    yield member, None, f'Extraction impossible: {e}'
+                    continue
+                yield member, filepath, None
+
+def count_bulk_inputs(job):
+    """Nombre de fichiers d'un import, refusés à l'upload compris (seul le
+    répertoire des ZIP est lu)
+    """
+    total = 0
+    for name, path in job['inputs']:
+        if not name.lower().endswith('.zip'):
+            total += 1
+            continue
+        try:
+            with zipfile.ZipFile(path) as archive:
+                total += sum(1 for info in archive.infolist() if not info.is_dir())
+        except (OSError, zipfile.BadZipFile):
+            total += 1
+    return total + job.get('refused', 0)
+
+def init_bulk_worker(max_processes, thread_limit):
+    """Initialise un processus de l'import en masse
+
+    Chaque processus réimporte l'application avec le plafond de tout le
+    serveur (OCR_MAX_PROCESSES) : il n'en garde que sa part, et n'évalue pas
+    plus de configurations à la fois qu'il ne peut lancer de processus.
+    Les threads OpenMP de Tesseract restent calculés sur le plafond du
+    serveur, pas sur cette part.
+    """
+    os.environ.setdefault('OMP_THREAD_LIMIT', str(thread_limit))
+    pytesseract.set_max_processes(max_processes)
+    app.config['OCR_MAX_WORKERS'] = min(app.config['OCR_MAX_WORKERS'], max_processes)
+
+def run_bulk_job(job):
+    """Pipeline d'un import en masse
+
+    Extraction des fichiers -> lecture, redressement, OCR, extraction et
+    annotation dans un pool de processus -> enregistrement par lots dans
+    factures.json. Chaque fichier a son entrée dans le rapport du job ; une
+    entrée 'ok' n'y figure qu'une fois sa facture enregistrée.
+    """
+    try:
+        _run_bulk_job(job)
+    except Exception as e:
+        update_job(job, status='erreur', error=f"Erreur lors de l'import: {str(e)}")
+    finally:
+        shutil.rmtree(job['bulk_dir'], ignore_errors=True)
+
+def _run_bulk_job(job):
+    report = job['report']
+    done = {entry['fichier'] for entry in report}
+    total = count_bulk_inputs(job)
+    update_job(job, status='en_cours', stage='import', total=total,
+               progress=len(report) / total if total else 0)
+    
+    pending = []
+    
+    def record(entry):
+        # Erreurs et doublons sont écrits tout de suite : après un
+        # redémarrage, leur fichier peut déjà avoir été supprimé
+        report.append(entry)
+        update_job(job, report=report, progress=len(report) / total)
+    
+    def commit():
+        entries = [(data, annotated, name, prints)
+                   for name, data, annotated, prints in pending]
+        facture_ids = save_factures(entries) if entries else []
+        for (name, _, annotated, _), facture_id in zip(pending, facture_ids):
+            report.append({
+                'fichier': name,
+                'status': 'ok',
+                'facture_id': facture_id,
+                'annotated_image': f'/uploads/{annotated}',
+                'error': None
+            })
+        pending.clear()
+        update_job(job, report=report, progress=len(report) / total if total else 1)
+    
+    def collect(future, name, prints):
+        try:
+            invoice_data, annotated_filename = future.result()
+        except Exception as e:
+            record({'fichier': name, 'status': 'erreur', 'error': str(e)})
+            return
+        pending.append((name, invoice_data, annotated_filename, prints))
+        if len(pending) >= app.config['BULK_COMMIT_SIZE']:
+            commit()
+    
+    # spawn : les workers ne doivent pas hériter des threads de Flask. Le
+    # plafond de processus Tesseract est partagé entre eux et le processus
+    # principal, qui garde une part pour les uploads simples
+    workers = app.config['BULK_WORKERS']
+    max_processes = max(1, app.config['OCR_MAX_PROCESSES'] // (workers + 1))
+    thread_limit = max(1, (os.cpu_count() or 1) // app.config['OCR_MAX_PROCESSES'])
+    # Fichiers de cet import déjà envoyés à l'OCR, par SHA-256
+    seen = {}
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_bulk_worker,
+        initargs=(max_processes, thread_limit)
+    ) as executor:
+        running = {}
+        for name, filepath, error in iter_bulk_inputs(job, done):
+            if error:
+                record({'fichier': name, 'status': 'erreur', 'error': error})
+                continue
+            
+            # Fichier identique à une facture enregistrée ou à un fichier de
+            # l'import. Une image seulement similaire est traitée : sans
+            # personne pour confirmer, ce peut être une autre facture du même
+            # modèle
+            try:
+                prints = fingerprint(filepath)
+            except OSError as e:
+                # Analysé avant un redémarrage mais pas encore enregistré :
+                # l'OCR a supprimé le fichier
+                record({'fichier': name, 'status': 'erreur',
+                        'error': f'Fichier introuvable: {e}'})
+                continue
+            duplicate = fingerprint_index.find(prints)
+            if duplicate and duplicate[1] != 'identique':
+                duplicate = None
+            if duplicate or prints['sha256'] in seen:
+                os.remove(filepath)
+                facture = duplicate[0] if duplicate else None
+                record({
+                    'fichier': name,
+                    'status': 'doublon',
+                    'facture_id': facture['id'] if facture else None,
+                    'annotated_image': (
+                        f"/factures/{facture['annotated_image']}"
+                        if facture and facture.get('annotated_image') else None
+                    ),
+                    'error': None if facture else f"Identique à {seen[prints['sha256']]}"
+                })
+                continue
+            seen[prints['sha256']] = name
+            
+            filename = os.path.basename(filepath)
+            running[executor.submit(analyze_invoice, filepath, filename)] = (name, prints)
+            # Fenêtre bornée : extraire au rythme de l'OCR, pas plus vite
+            if len(running) >= workers * 2:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future, *running.pop(future))
+        for future in list(running):
+            collect(future, *running.pop(future))
+    commit()
+    
+    ok = sum(1 for entry in report if entry['status'] == 'ok')
+    duplicates = sum(1 for entry in report if entry['status'] == 'doublon')
+    update_job(
+        job,
+        status='termine',
+        stage='termine',
+        progress=1,
+        result={'success': True, 'total': len(report), 'ok': ok,
+                'doublons': duplicates, 'erreurs': len(report) - ok - duplicates}
+    )
+
+def job_worker():
+    while True:
+        job_id = job_queue.get()
+        try:
+            run_job(job_id)
+        except Exception as e:
+            print(f"Erreur du worker OCR sur le job {job_id}: {e}")
+        finally:
+            job_queue.task_done()
+
+def restore_jobs():
+    """Remet en file les jobs en attente ou interrompus par un redémarrage"""
+    jobs = []
+    for name in os.listdir(app.config['JOBS_FOLDER']):
+        if name.endswith('.json'):
+            job = load_job(name[:-len('.json')])
+            if job and job['status'] in ('en_attente', 'en_cours'):
+                jobs.append(job)
+    
+    for job in sorted(jobs, key=lambda job: job['created']):
+        if not os.path.exists(job.get('filepath') or job.get('bulk_dir')):
+            update_job(job, status='erreur', error='Fichier introuvable après redémarrage')
+            continue
+        update_job(job, status='en_attente', stage='en_attente', progress=0)
+        job_queue.put(job['id'])
+
+def start_job_workers():
+    """Démarre les workers OCR (une seule fois par processus)"""
+    global job_workers_started
+    with job_workers_lock:
+        if job_workers_started:
+            return
+        job_workers_started = True
+        restore_jobs()
+        for i in range(app.config['OCR_JOB_WORKERS']):
+            threading.Thread(target=job_worker, name=f'ocr-job-{i}', daemon=True).start()
+
+@app.before_request
+def ensure_job_workers():
+    # Au premier appel servi, et pas dans le processus du reloader de Flask
+    start_job_workers()
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     # Vérifier que Tesseract est disponible avant de traiter
@@ -811,160 +1861,125 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        # Préfixer par l'id du job : des fichiers de même nom peuvent attendre
+        job_id = uuid.uuid4().hex
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f'{job_id}_{filename}')
         file.save(filepath)
         
-        try:
-            # Lire l'image avec OpenCV
-            img = cv2.imread(filepath)
-            if img is None:
-                return jsonify({'error': "Impossible de lire l'image"}), 400
-            
-            # Améliorer l'image pour de meilleurs résultats OCR
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Appliquer un seuil adaptatif pour améliorer le contraste
-            thresh = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
-            )
-            
-            # Convertir en PIL Image pour pytesseract
-            pil_image = Image.fromarray(thresh)
-            
-            # Vérifier que Tesseract est disponible
-            try:
-                # Utiliser l'image originale pour l'OCR et les annotations
-                original_pil = Image.open(filepath)
-                
-                # Essayer plusieurs configurations PSM pour de meilleurs résultats
-                configs_to_try = [
-                    ('--psm 6', 'fra+eng'),  # Bloc uniforme, français + anglais
-                    ('--psm 3', 'fra+eng'),  # Automatique
-                    ('--psm 11', 'fra+eng'), # Texte dense
-                    ('--psm 6', 'eng'),      # Fallback anglais seulement
-                ]
-                
-                full_text = None
-                best_text = ""
-                ocr_data = None
-                best_config = ('--psm 6', 'fra+eng')
-                
-                for psm_config, lang_config in configs_to_try:
-                    try:
-                        text = pytesseract.image_to_string(
-                            original_pil,
-                            lang=lang_config,
-                            config=psm_config
-                        )
-                        # Garder le texte le plus long (généralement le plus complet)
-                        if len(text.strip()) > len(best_text.strip()):
-                            best_text = text
-                            full_text = text
-                            best_config = (psm_config, lang_config)
-                    except Exception as e:
-                        # Continuer avec la configuration suivante
-                        continue
-                
-                # Si aucune configuration n'a fonctionné, utiliser la dernière tentative
-                if not full_text:
-                    full_text = pytesseract.image_to_string(
-                        original_pil,
-                        lang='fra+eng',
-                        config='--psm 6'
-                    )
-                    best_config = ('--psm 6', 'fra+eng')
-                
-                # Obtenir les données OCR avec coordonnées pour les annotations
-                try:
-                    ocr_data_dict = pytesseract.image_to_data(
-                        original_pil,
-                        lang=best_config[1],
-                        config=best_config[0],
-                        output_type=pytesseract.Output.DICT
-                    )
-                    # Convertir en liste de dictionnaires
-                    ocr_data = []
-                    n_boxes = len(ocr_data_dict['text'])
-                    for i in range(n_boxes):
-                        if int(ocr_data_dict['conf'][i]) > 0:  # Ignorer les confidences 0
-                            ocr_data.append({
-                                'text': ocr_data_dict['text'][i],
-                                'left': ocr_data_dict['left'][i],
-                                'top': ocr_data_dict['top'][i],
-                                'width': ocr_data_dict['width'][i],
-                                'height': ocr_data_dict['height'][i],
-                                'conf': ocr_data_dict['conf'][i]
-                            })
-                except Exception as e:
-                    print(f"Erreur lors de la récupération des coordonnées OCR: {e}")
-                    ocr_data = None
-                    
-            except pytesseract.TesseractNotFoundError:
-                error_msg = (
-                    "Tesseract OCR n'est pas installé ou introuvable.\n\n"
-                    "📥 INSTALLATION REQUISE:\n\n"
-                    "Méthode 1 - Installation manuelle:\n"
-                    "1. Téléchargez: https://github.com/UB-Mannheim/tesseract/wiki\n"
-                    "2. Installez et cochez 'Add to PATH'\n"
-                    "3. Sélectionnez French (fra) et English (eng)\n"
-                    "4. Redémarrez l'application\n\n"
-                    "Méthode 2 - Via winget:\n"
-                    "winget install --id UB-Mannheim.TesseractOCR\n\n"
-                    "Méthode 3 - Via Chocolatey:\n"
-                    "choco install tesseract\n\n"
-                    "Après installation, redémarrez l'application Flask."
-                )
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                return jsonify({'error': error_msg}), 500
-            except Exception as ocr_error:
-                # En cas d'erreur OCR, essayer avec l'image originale
-                try:
-                    original_pil = Image.open(filepath)
-                    full_text = pytesseract.image_to_string(
-                        original_pil,
-                        lang='fra+eng',
-                        config='--psm 6'
-                    )
-                except:
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                    return jsonify({'error': f'Erreur OCR: {str(ocr_error)}'}), 500
-            
-            # Extraire les données structurées avec coordonnées
-            invoice_data = extract_invoice_data(full_text, ocr_data)
-            
-            # Dessiner les annotations sur l'image originale
-            annotated_img = draw_annotations_on_image(img, invoice_data)
-            
-            # Sauvegarder l'image annotée
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            annotated_filename = f'annotated_{timestamp}_{filename}'
-            annotated_filepath = os.path.join(app.config['UPLOAD_FOLDER'], annotated_filename)
-            cv2.imwrite(annotated_filepath, annotated_img)
-            
-            # Sauvegarder la facture dans le système
-            facture_id = save_facture(invoice_data, annotated_filename, filename)
-            
-            # Nettoyer le fichier temporaire original (garder l'annotée)
+        # Fichier déjà importé : renvoyer la facture enregistrée, sans OCR.
+        # force=1 le traite quand même
+        prints = fingerprint(filepath)
+        duplicate = fingerprint_index.find(prints)
+        if duplicate and duplicate[1] == 'identique' and not request.form.get('force'):
             os.remove(filepath)
-            
-            return jsonify({
-                'success': True,
-                'data': invoice_data,
-                'annotated_image': f'/uploads/{annotated_filename}',
-                'facture_id': facture_id
-            })
-            
-        except Exception as e:
-            # Nettoyer en cas d'erreur
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            return jsonify({'error': f'Erreur lors du traitement: {str(e)}'}), 500
+            return jsonify(duplicate_response(*duplicate))
+        
+        # Image seulement similaire : nouveau scan de la même facture, ou
+        # autre facture du même modèle. L'OCR a lieu, avec un lien vers la
+        # facture proche pour vérifier
+        possible_duplicate = duplicate_info(*duplicate) if duplicate else None
+        
+        # Le traitement se fait en arrière-plan : répondre tout de suite
+        create_job(job_id, filepath, filename, prints, possible_duplicate)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'possible_duplicate': possible_duplicate,
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id)
+        }), 202
     
     return jsonify({'error': 'Type de fichier non autorisé'}), 400
 
+@app.route('/upload/bulk', methods=['POST'])
+def upload_bulk():
+    """Import en masse : plusieurs images et/ou archives ZIP (champ 'files')"""
+    # Un import en masse dépasse la limite d'un upload simple (Flask >= 3.1 ;
+    # sinon MAX_CONTENT_LENGTH s'applique)
+    try:
+        request.max_content_length = app.config['BULK_MAX_CONTENT_LENGTH']
+    except AttributeError:
+        pass
+    
+    if not TESSERACT_AVAILABLE:
+        return jsonify({'error': 'Tesseract OCR n\'est pas installé.'}), 500
+    
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'Aucun fichier fourni'}), 400
+    
+    job_id = uuid.uuid4().hex
+    bulk_dir = os.path.join(app.config['UPLOAD_FOLDER'], f'bulk_{job_id}')
+    os.makedirs(bulk_dir)
+    
+    # Les fichiers sont recopiés tels quels sur disque, les ZIP seront
+    # extraits par le job
+    inputs = []
+    report = []
+    for index, file in enumerate(files):
+        filename = secure_filename(file.filename) or 'facture'
+        if not (filename.lower().endswith('.zip') or allowed_file(filename)):
+            report.append({'fichier': file.filename, 'status': 'erreur',
+                           'error': 'Type de fichier non autorisé'})
+            continue
+        filepath = os.path.join(bulk_dir, f'{index}_{filename}')
+        file.save(filepath)
+        inputs.append((file.filename, filepath))
+    
+    if not inputs:
+        shutil.rmtree(bulk_dir, ignore_errors=True)
+        return jsonify({'error': 'Type de fichier non autorisé', 'report': report}), 400
+    
+    create_bulk_job(job_id, bulk_dir, inputs, report)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'events_url': url_for('job_events', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    return jsonify(job_public(job))
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Flux Server-Sent Events de la progression d'un job"""
+    if load_job(job_id) is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    def stream():
+        last = None
+        while True:
+            with jobs_condition:
+                version = jobs_version
+            job = load_job(job_id)
+            if job is None:
+                return
+            if job != last:
+                yield f"data: {json.dumps(job_public(job), ensure_ascii=False)}\n\n"
+                last = job
+            if job['status'] in ('termine', 'erreur'):
+                return
+            with jobs_condition:
+                changed = jobs_condition.wait_for(
+                    lambda: jobs_version != version, timeout=15
+                )
+            if not changed:
+                # Commentaire SSE pour garder la connexion ouverte
+                yield ': ping\n\n'
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
+    # Avec le reloader, seul le processus qui sert les requêtes traite les jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_workers()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Benchmark des profils de prétraitement (PREPROCESS_PROFILES de app.py)
+
+Pour chaque facture, l'image est lue et redressée une fois, puis chaque
+profil passe par le même chemin que l'application : prétraitement, OCR et
+extraction des champs. Le script affiche, par profil, le temps de
+prétraitement, le temps total (médiane et 90e centile) et la précision de
+l'extraction, puis le profil le moins coûteux dont la précision reste à
+--tolerance près de la meilleure.
+
+La précision est mesurée par rapport à un fichier de vérité JSON,
+{"facture.png": {"numero_facture": "F-2024-001", "date": "12/03/2024"}},
+ou, sans ce fichier, par la part des champs essentiels trouvés.
+
+    python benchmark_profils.py factures/ --verite verite.json
+    python benchmark_profils.py a.jpg b.jpg --profils rapide precis -o res.json
+"""
+import argparse
+import json
+import os
+import sys
+from statistics import mean, median, quantiles
+from time import perf_counter
+
+import app
+from app import (
+    CHAMPS_ESSENTIELS,
+    PREPROCESS_PROFILES,
+    InvoiceImage,
+    extract_invoice_data,
+    orient_image,
+    run_ocr,
+)
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def list_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.lower().endswith(EXTENSIONS)
+            )
+        else:
+            images.append(path)
+    return images
+
+
+def normalize(value):
+    return ''.join(str(value).lower().split())
+
+
+def accuracy(data, expected):
+    """Part des champs attendus extraits à l'identique (espaces et casse ignorés)
+
+    Sans vérité, part des champs essentiels trouvés.
+    """
+    if expected is None:
+        return sum(1 for champ in CHAMPS_ESSENTIELS if data.get(champ)) / len(
+            CHAMPS_ESSENTIELS
+        )
+    if not expected:
+        return 1.0
+    return sum(
+        1
+        for champ, valeur in expected.items()
+        if normalize(data.get(champ, '')) == normalize(valeur)
+    ) / len(expected)
+
+
+def percentile_90(values):
+    if len(values) < 2:
+        return values[0]
+    return quantiles(values, n=10, method='inclusive')[-1]
+
+
+def run(images, profiles, truth, repeat):
+    results = {
+        profile: {'pretraitement': [], 'total': [], 'precision': []}
+        for profile in profiles
+    }
+    for filepath in images:
+        image = InvoiceImage.read(filepath)
+        pixels, lang = orient_image(image.pixels)
+        expected = None
+        if truth is not None:
+            expected = truth.get(os.path.basename(filepath), {})
+
+        for profile in profiles:
+            for _ in range(repeat):
+                # Nouvelle InvoiceImage sur le même tampon : rien n'est
+                # gardé en cache d'un profil ou d'une répétition à l'autre
+                image = InvoiceImage(pixels)
+                start = perf_counter()
+                image.preprocessed(profile)
+                preprocessed = perf_counter()
+                text, ocr_data = run_ocr(image, lang, profile)
+                data = extract_invoice_data(text, ocr_data)
+                end = perf_counter()
+
+                result = results[profile]
+                result['pretraitement'].append(preprocessed - start)
+                result['total'].append(end - start)
+                result['precision'].append(accuracy(data, expected))
+            print(f'{filepath} [{profile}] {accuracy(data, expected):.0%}',
+                  file=sys.stderr)
+
+    return {
+        profile: {
+            'pretraitement_moyen': mean(result['pretraitement']),
+            'total_median': median(result['total']),
+            'total_p90': percentile_90(result['total']),
+            'precision': mean(result['precision']),
+        }
+        for profile, result in results.items()
+    }
+
+
+def choose_profile(summary, tolerance):
+    """Profil le plus rapide dont la précision est à tolerance de la meilleure"""
+    best = max(result['precision'] for result in summary.values())
+    return min(
+        (
+            profile
+            for profile, result in summary.items()
+            if result['precision'] >= best - tolerance
+        ),
+        key=lambda profile: summary[profile]['total_median'],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='+',
+                        help='images de factures, ou dossiers qui en contiennent')
+    parser.add_argument('--verite', help='fichier JSON des champs attendus')
+    parser.add_argument('--profils', nargs='+', choices=PREPROCESS_PROFILES,
+                        default=list(PREPROCESS_PROFILES))
+    parser.add_argument('--repetitions', type=int, default=1)
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='perte de précision acceptée (0 à 1)')
+    parser.add_argument('-o', '--output', help='écrit les résultats en JSON')
+    args = parser.parse_args()
+
+    if not app.TESSERACT_AVAILABLE:
+        parser.error("Tesseract OCR n'est pas installé ou introuvable")
+    images = list_images(args.images)
+    if not images:
+        parser.error('aucune image trouvée')
+    truth = None
+    if args.verite:
+        with open(args.verite, encoding='utf-8') as f:
+            truth = json.load(f)
+
+    summary = run(images, args.profils, truth, args.repetitions)
+    recommended = choose_profile(summary, args.tolerance)
+
+    print(f"{'profil':<10} {'prétrait.':>10} {'médiane':>10} {'p90':>10} "
+          f"{'précision':>10}")
+    for profile, result in summary.items():
+        print(f"{profile:<10} {result['pretraitement_moyen'] * 1000:>8.0f}ms "
+              f"{result['total_median']:>9.2f}s {result['total_p90']:>9.2f}s "
+              f"{result['precision']:>10.0%}")
+    print(f'\nProfil recommandé (OCR_PROFILE) : {recommended}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'images': len(images), 'profils': summary,
+                 'recommande': recommended},
+                f, ensure_ascii=False, indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
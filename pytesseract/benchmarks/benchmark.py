@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+"""
+Benchmarks the per-call overhead and throughput of pytesseract.
+
+Runs image_to_string, image_to_data (for every available output type),
+run_and_get_multiple_output and a multiprocessing Pool over the bundled
+test images and synthetic A4 pages, and writes the latency percentiles,
+images per second and mean time per stage of every case to a JSON file.
+
+    python benchmarks/benchmark.py -o results.json
+    python benchmarks/benchmark.py -o new.json --compare results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from datetime import timezone
+from functools import partial
+from glob import glob
+from multiprocessing import Pool
+from os import cpu_count
+from os import path
+from statistics import mean
+from time import perf_counter
+
+from PIL import Image
+from PIL import ImageDraw
+
+import pytesseract
+from pytesseract import get_tesseract_version
+from pytesseract import image_to_data
+from pytesseract import image_to_string
+from pytesseract import Output
+from pytesseract import run_and_get_multiple_output
+from pytesseract import timing_hook
+from pytesseract.pytesseract import numpy_installed
+from pytesseract.pytesseract import pandas_installed
+from pytesseract.pytesseract import SUPPORTED_FORMATS
+
+DATA_DIR = path.join(
+    path.dirname(path.dirname(path.abspath(__file__))),
+    'tests',
+    'data',
+)
+# A4 at 150 DPI
+A4_SIZE = (1240, 1754)
+PERCENTILES = (50, 90, 99)
+
+TEXT = (
+    'The quick brown fox jumps over the lazy dog. Invoice 2024-0042, '
+    'total 1 234,56 EUR, due 30/09/2024.'
+)
+
+
+def load_images(data_dir):
+    """Returns {name: filename} for the test images Tesseract can read."""
+    images = {}
+    for filename in sorted(glob(path.join(data_dir, 'test.*'))):
+        try:
+            with Image.open(filename) as image:
+                if image.format not in SUPPORTED_FORMATS:
+                    continue
+        except OSError:
+            continue
+        images[path.basename(filename)] = filename
+    return images
+
+
+def a4_page(lines=60):
+    """Returns a synthetic A4 page with lines of black text on white."""
+    page = Image.new('L', A4_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    line_height = (A4_SIZE[1] - 200) // lines
+    for line in range(lines):
+        draw.text((100, 100 + line * line_height), TEXT, fill=0)
+    return page
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    index = (len(samples) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (index - lower)
+
+
+def summarize(latencies, images, elapsed, stages):
+    result = {
+        'runs': len(latencies),
+        'images': images,
+        'images_per_second': images / elapsed if elapsed else None,
+        'latency_ms': {
+            'mean': mean(latencies) * 1000,
+            'min': min(latencies) * 1000,
+            'max': max(latencies) * 1000,
+        },
+        'stages_ms': {
+            name: mean(record[name] for record in stages) * 1000
+            for name in stages[0]
+        }
+        if stages
+        else {},
+    }
+    for percent in PERCENTILES:
+        result['latency_ms'][f'p{percent}'] = (
+            percentile(latencies, percent) * 1000
+        )
+    return result
+
+
+def measure(func, inputs, iterations, warmup):
+    """Calls func on every input iterations times, after warmup calls."""
+    for image in inputs[:warmup]:
+        func(image)
+
+    latencies = []
+    stages = []
+    with timing_hook(lambda record: stages.append(dict(record.stages))):
+        start = perf_counter()
+        for _ in range(iterations):
+            for image in inputs:
+                call_start = perf_counter()
+                func(image)
+                latencies.append(perf_counter() - call_start)
+        elapsed = perf_counter() - start
+
+    return summarize(latencies, len(latencies), elapsed, stages)
+
+
+def measure_multiprocessing(inputs, iterations, processes, lang):
+    images = inputs * iterations
+    func = partial(image_to_string, lang=lang)
+    with Pool(processes) as pool:
+        pool.map(func, inputs[:processes])
+        start = perf_counter()
+        pool.map(func, images)
+        elapsed = perf_counter() - start
+
+    # the pool only gives the wall time of the whole map
+    return summarize(
+        [elapsed / len(images) * processes],
+        len(images),
+        elapsed,
+        [],
+    )
+
+
+def data_output_types():
+    output_types = [Output.STRING, Output.BYTES, Output.DICT]
+    if numpy_installed:
+        output_types.append(Output.NUMPY)
+    if pandas_installed:
+        output_types.append(Output.DATAFRAME)
+    return output_types
+
+
+def cases(lang):
+    yield 'image_to_string', partial(image_to_string, lang=lang)
+    for output_type in data_output_types():
+        yield f'image_to_data[{output_type}]', partial(
+            image_to_data,
+            lang=lang,
+            output_type=output_type,
+        )
+    yield 'run_and_get_multiple_output[txt+box]', partial(
+        run_and_get_multiple_output,
+        extensions=['txt', 'box'],
+        lang=lang,
+    )
+
+
+def run(args):
+    sets = {}
+    test_images = load_images(args.data_dir)
+    if test_images:
+        sets['test_images'] = list(test_images.values())
+    if args.a4_pages:
+        sets['a4_pages'] = [a4_page() for _ in range(args.a4_pages)]
+
+    results = {}
+    for set_name, inputs in sets.items():
+        for case_name, func in cases(args.lang):
+            name = f'{set_name}/{case_name}'
+            print(name, file=sys.stderr)
+            results[name] = measure(func, inputs, args.iterations, args.warmup)
+
+        if args.processes and set_name == 'test_images':
+            name = f'{set_name}/multiprocessing[{args.processes}]'
+            print(name, file=sys.stderr)
+            results[name] = measure_multiprocessing(
+                inputs,
+                args.iterations,
+                args.processes,
+                args.lang,
+            )
+
+    return {
+        'metadata': {
+            'date': datetime.now(timezone.utc).isoformat(),
+            'pytesseract_version': pytesseract.__version__,
+            'tesseract_version': str(get_tesseract_version()),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': cpu_count(),
+            'images': {
+                set_name: len(inputs) for set_name, inputs in sets.items()
+            },
+            'iterations': args.iterations,
+            'lang': args.lang,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns the cases whose p50 latency regressed by more than threshold."""
+    regressions = []
+    for name, result in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        before = previous['latency_ms']['p50']
+        after = result['latency_ms']['p50']
+        change = (after - before) / before if before else 0.0
+        print(
+            f'{name}: {before:.1f} ms -> {after:.1f} ms ({change:+.1%})',
+            file=sys.stderr,
+        )
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-o', '--output', default='benchmark.json')
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('-l', '--lang', default='eng')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument(
+        '--a4-pages',
+        type=int,
+        default=2,
+        help='number of synthetic A4 pages (0 to skip)',
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=cpu_count() or 1,
+        help='multiprocessing Pool size (0 to skip)',
+    )
+    parser.add_argument('--compare', help='baseline JSON results to compare')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='p50 latency regression that fails --compare (default 0.1)',
+    )
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'Regressions: {", ".join(regressions)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
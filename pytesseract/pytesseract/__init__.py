@@ -7,15 +7,42 @@ from .pytesseract import get_tesseract_version
 from .pytesseract import image_to_alto_xml
 from .pytesseract import image_to_boxes
 from .pytesseract import image_to_data
+from .pytesseract import image_to_data_batch
 from .pytesseract import image_to_osd
 from .pytesseract import image_to_pdf_or_hocr
 from .pytesseract import image_to_string
+from .pytesseract import image_to_string_batch
+from .pytesseract import iter_image_to_data
+from .pytesseract import iter_image_to_string
 from .pytesseract import Output
+from .pytesseract import run_and_get_batch_output
 from .pytesseract import run_and_get_multiple_output
 from .pytesseract import run_and_get_output
 from .pytesseract import TesseractError
 from .pytesseract import TesseractNotFoundError
 from .pytesseract import TSVNotSupported
+from .admission import get_admission_stats
+from .admission import set_max_processes
+from .admission import TesseractQueueTimeout
+from .aio import aimage_to_alto_xml
+from .aio import aimage_to_boxes
+from .aio import aimage_to_data
+from .aio import aimage_to_osd
+from .aio import aimage_to_pdf_or_hocr
+from .aio import aimage_to_string
+from .aio import arun_and_get_output
+from .best_of import ocr_best_of
+from .cache import OCRCache
+from .orientation import auto_rotate
+from .orientation import detect_orientation
+from .pool import TesseractPool
+from .tiling import image_to_data_tiled
+from .timing import add_timing_hook
+from .timing import get_timing_stats
+from .timing import remove_timing_hook
+from .timing import reset_timing_stats
+from .timing import timing_hook
+from .timing import TimingRecord
 
 
 __version__ = '0.3.14'
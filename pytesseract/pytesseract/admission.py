@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Process-wide admission control for Tesseract processes.
+
+set_max_processes(n) caps the number of Tesseract processes running at once
+across all threads, TesseractPool workers and event loops of the process.
+Callers over the limit queue for a slot for at most queue_timeout seconds,
+then get TesseractQueueTimeout. While a limit is set, every process is also
+started with OMP_THREAD_LIMIT so that n processes use at most one thread
+per core, unless OMP_THREAD_LIMIT is already set in the environment.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from os import cpu_count
+from time import monotonic
+
+from .timing import stage
+
+
+class TesseractQueueTimeout(RuntimeError):
+    def __init__(self):
+        super().__init__('Timed out waiting for a free Tesseract slot')
+
+
+class _Limiter:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.max_processes = None
+        self.queue_timeout = None
+        self.running = 0
+        self.queued = 0
+        self._stats = {
+            'admitted': 0,
+            'timeouts': 0,
+            'max_queued': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+
+    def _has_slot(self):
+        return not self.max_processes or self.running < self.max_processes
+
+    def configure(self, max_processes, queue_timeout):
+        with self._cond:
+            self.max_processes = max_processes
+            self.queue_timeout = queue_timeout
+            self._cond.notify_all()
+
+    def acquire(self):
+        start = monotonic()
+        with stage('queue'), self._cond:
+            if not self._has_slot():
+                self.queued += 1
+                self._stats['max_queued'] = max(
+                    self._stats['max_queued'],
+                    self.queued,
+                )
+                try:
+                    admitted = self._cond.wait_for(
+                        self._has_slot,
+                        self.queue_timeout,
+                    )
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self._stats['timeouts'] += 1
+                    raise TesseractQueueTimeout()
+
+            self.running += 1
+            wait_time = monotonic() - start
+            self._stats['admitted'] += 1
+            self._stats['wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(
+                self._stats['max_wait_time'],
+                wait_time,
+            )
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                max_processes=self.max_processes,
+                running=self.running,
+                queued=self.queued,
+            )
+
+
+_limiter = _Limiter()
+
+
+def set_max_processes(max_processes, queue_timeout=None):
+    """
+    Limits the number of concurrent Tesseract processes; None removes the
+    limit. queue_timeout bounds the seconds a call waits for a slot.
+    """
+    if max_processes is not None and max_processes < 1:
+        raise ValueError('max_processes must be at least 1')
+    _limiter.configure(max_processes, queue_timeout)
+
+
+def get_admission_stats():
+    """
+    Returns the limit, the number of running and queued processes, and the
+    admitted, timed out, peak queue depth and total/max queue wait seconds
+    """
+    return _limiter.stats()
+
+
+def omp_thread_limit():
+    """Returns the OMP_THREAD_LIMIT for the current limit, or None."""
+    max_processes = _limiter.max_processes
+    if not max_processes:
+        return None
+    return max(1, (cpu_count() or 1) // max_processes)
+
+
+@contextmanager
+def slot():
+    """Holds one of the Tesseract process slots for the block."""
+    _limiter.acquire()
+    try:
+        yield
+    finally:
+        _limiter.release()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+"""
+Awaitable counterparts of the pytesseract functions.
+
+Images are encoded in a worker thread and piped to Tesseract's stdin, the
+result is read from its stdout, and at most max_concurrency Tesseract
+processes run at once per event loop. A timeout kills the process like
+kill() does and raises RuntimeError; cancelling the awaiting task kills
+the process too.
+"""
+from __future__ import annotations
+
+import asyncio
+import weakref
+from errno import ENOENT
+from os import cpu_count
+
+from .pytesseract import _input_size
+from .pytesseract import _stream_input
+from .pytesseract import ALTONotSupported
+from .pytesseract import build_cmd_args
+from .pytesseract import DEFAULT_ENCODING
+from .pytesseract import file_to_dict
+from .pytesseract import file_to_ndarray
+from .pytesseract import get_errors
+from .pytesseract import get_tesseract_version
+from .pytesseract import osd_to_dict
+from .pytesseract import Output
+from .pytesseract import run_and_get_output
+from .pytesseract import STDOUT_EXTENSIONS
+from .pytesseract import subprocess_args
+from .pytesseract import TESSERACT_ALTO_VERSION
+from .pytesseract import TESSERACT_MIN_VERSION
+from .pytesseract import TesseractError
+from .pytesseract import TesseractNotFoundError
+from .pytesseract import tsv_to_dataframe
+from .pytesseract import TSVNotSupported
+from .admission import _limiter
+from .layout import parse_alto
+from .layout import parse_hocr
+from .timing import add_bytes_out
+from .timing import describe
+from .timing import stage
+from .timing import timed
+
+max_concurrency = cpu_count() or 1
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def set_max_concurrency(value):
+    """Changes the per event loop limit of running Tesseract processes."""
+    global max_concurrency
+
+    if value < 1:
+        raise ValueError('max_concurrency must be at least 1')
+    max_concurrency = value
+    _semaphores.clear()
+
+
+def _get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(max_concurrency)
+    return semaphore
+
+
+async def _kill(process):
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), 1)
+    except (asyncio.TimeoutError, ProcessLookupError):
+        pass
+    finally:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+async def _reap(process):
+    # the process must be gone before its slot is released: wait for it
+    # even if the task is cancelled again meanwhile (it was just killed)
+    wait = asyncio.ensure_future(process.wait())
+    while not wait.done():
+        try:
+            await asyncio.shield(wait)
+        except asyncio.CancelledError:
+            pass
+
+
+async def _acquire_slot():
+    # the global limiter blocks, so wait for it in a worker thread and hand
+    # the slot back if the task is cancelled while waiting
+    acquire = asyncio.ensure_future(asyncio.to_thread(_limiter.acquire))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        acquire.add_done_callback(
+            lambda f: f.cancelled() or f.exception() or _limiter.release(),
+        )
+        raise
+
+
+async def _run_tesseract(cmd_args, input_data=None, timeout=0):
+    await _acquire_slot()
+    try:
+        return await _run_admitted(cmd_args, input_data, timeout)
+    finally:
+        _limiter.release()
+
+
+async def _run_admitted(cmd_args, input_data, timeout):
+    try:
+        with stage('spawn'):
+            proc = await asyncio.create_subprocess_exec(
+                *cmd_args,
+                **subprocess_args(),
+            )
+    except OSError as e:
+        if e.errno != ENOENT:
+            raise
+        else:
+            raise TesseractNotFoundError()
+
+    try:
+        with stage('wait'):
+            output, error_string = await asyncio.wait_for(
+                proc.communicate(input_data),
+                timeout or None,
+            )
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise RuntimeError('Tesseract process timeout')
+    except asyncio.CancelledError:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await _reap(proc)
+        raise
+
+    if proc.returncode:
+        raise TesseractError(proc.returncode, get_errors(error_string))
+    add_bytes_out(len(output))
+    return output
+
+
+@timed
+async def arun_and_get_output(
+    image,
+    extension='',
+    lang=None,
+    config='',
+    nice=0,
+    timeout=0,
+    return_bytes=False,
+):
+    if extension not in STDOUT_EXTENSIONS:
+        return await asyncio.to_thread(
+            run_and_get_output,
+            image,
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+            return_bytes,
+        )
+
+    async with _get_semaphore():
+        with stage('encode'):
+            input_filename, input_data = await asyncio.to_thread(
+                _stream_input,
+                image,
+            )
+        cmd_args = build_cmd_args(
+            input_filename,
+            'stdout',
+            extension,
+            lang,
+            config,
+            nice,
+        )
+        describe(
+            extension,
+            lang,
+            config,
+            _input_size(input_filename, input_data),
+        )
+        output = await _run_tesseract(cmd_args, input_data, timeout)
+
+    return output if return_bytes else output.decode(DEFAULT_ENCODING)
+
+
+@timed
+async def aimage_to_string(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+):
+    """
+    Returns the result of a Tesseract OCR run on the provided image to string
+    """
+    args = [image, 'txt', lang, config, nice, timeout]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*(args + [True]))
+    if output_type == Output.DICT:
+        return {'text': await arun_and_get_output(*args)}
+    if output_type == Output.STRING:
+        return await arun_and_get_output(*args)
+    raise KeyError(output_type)
+
+
+@timed
+async def aimage_to_pdf_or_hocr(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    extension='pdf',
+    timeout=0,
+    output_type=Output.BYTES,
+):
+    """
+    Returns the result of a Tesseract OCR run on the provided image to pdf/hocr
+    """
+
+    if extension not in {'pdf', 'hocr'}:
+        raise ValueError(f'Unsupported extension: {extension}')
+
+    if output_type == Output.WORDS and extension != 'hocr':
+        raise ValueError('Output.WORDS requires the hocr extension')
+
+    if extension == 'hocr':
+        config = f'-c tessedit_create_hocr=1 {config.strip()}'
+
+    args = [image, extension, lang, config, nice, timeout, True]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*args)
+    if output_type == Output.WORDS:
+        return parse_hocr(await arun_and_get_output(*args))
+    raise KeyError(output_type)
+
+
+@timed
+async def aimage_to_alto_xml(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    timeout=0,
+    output_type=Output.BYTES,
+):
+    """
+    Returns the result of a Tesseract OCR run on the provided image to ALTO XML
+    """
+
+    version = await asyncio.to_thread(get_tesseract_version, cached=True)
+    if version < TESSERACT_ALTO_VERSION:
+        raise ALTONotSupported()
+
+    config = f'-c tessedit_create_alto=1 {config.strip()}'
+    args = [image, 'xml', lang, config, nice, timeout, True]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*args)
+    if output_type == Output.WORDS:
+        return parse_alto(await arun_and_get_output(*args))
+    raise KeyError(output_type)
+
+
+@timed
+async def aimage_to_boxes(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+):
+    """
+    Returns string containing recognized characters and their box boundaries
+    """
+    config = (
+        f'{config.strip()} -c tessedit_create_boxfile=1 batch.nochop makebox'
+    )
+    args = [image, 'box', lang, config, nice, timeout]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*(args + [True]))
+    if output_type == Output.DICT:
+        return file_to_dict(
+            f'char left bottom right top page\n'
+            f'{await arun_and_get_output(*args)}',
+            ' ',
+            0,
+        )
+    if output_type == Output.STRING:
+        return await arun_and_get_output(*args)
+    raise KeyError(output_type)
+
+
+@timed
+async def aimage_to_data(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+    pandas_config=None,
+):
+    """
+    Returns string containing box boundaries, confidences,
+    and other information. Requires Tesseract 3.05+
+    """
+
+    version = await asyncio.to_thread(get_tesseract_version, cached=True)
+    if version < TESSERACT_MIN_VERSION:
+        raise TSVNotSupported()
+
+    config = f'-c tessedit_create_tsv=1 {config.strip()}'
+    args = [image, 'tsv', lang, config, nice, timeout]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*(args + [True]))
+    if output_type == Output.DATAFRAME:
+        return tsv_to_dataframe(
+            await arun_and_get_output(*(args + [True])),
+            pandas_config,
+        )
+    if output_type == Output.DICT:
+        return file_to_dict(await arun_and_get_output(*args), '\t', -1)
+    if output_type == Output.NUMPY:
+        return file_to_ndarray(await arun_and_get_output(*args), '\t', -1)
+    if output_type == Output.STRING:
+        return await arun_and_get_output(*args)
+    raise KeyError(output_type)
+
+
+@timed
+async def aimage_to_osd(
+    image,
+    lang='osd',
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+):
+    """
+    Returns string containing the orientation and script detection (OSD)
+    """
+    config = f'--psm 0 {config.strip()}'
+    args = [image, 'osd', lang, config, nice, timeout]
+
+    if output_type == Output.BYTES:
+        return await arun_and_get_output(*(args + [True]))
+    if output_type == Output.DICT:
+        return osd_to_dict(await arun_and_get_output(*args))
+    if output_type == Output.STRING:
+        return await arun_and_get_output(*args)
+    raise KeyError(output_type)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Batch mode of the pytesseract command line:
+
+    pytesseract --batch [-l lang] [-j jobs] [--manifest file] input ...
+
+Inputs are image files, directories (searched recursively), glob patterns
+or '-' to read one path per line from stdin. Every image is recognized by
+one of jobs parallel workers and a JSON Lines record with its path, text,
+error and timings is written as soon as it completes. Paths listed in the
+manifest file are skipped, and every image recognized without error is
+appended to it (as an absolute path), so an interrupted run can simply be
+started again.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextvars import copy_context
+from glob import has_magic
+from glob import iglob
+from os import cpu_count
+from os import path
+from os import walk
+
+from .pytesseract import image_to_string
+from .timing import _record
+
+IMAGE_EXTENSIONS = {
+    '.bmp',
+    '.gif',
+    '.jp2',
+    '.jpeg',
+    '.jpg',
+    '.pbm',
+    '.pgm',
+    '.png',
+    '.ppm',
+    '.tif',
+    '.tiff',
+    '.webp',
+}
+
+
+def _is_image(filename):
+    return path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+
+
+def iter_inputs(sources, stdin=sys.stdin):
+    """Yields the image paths of files, directories, globs and '-'."""
+    for source in sources:
+        if source == '-':
+            for line in stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif path.isdir(source):
+            for root, dirs, files in walk(source):
+                dirs.sort()
+                for filename in sorted(files):
+                    if _is_image(filename):
+                        yield path.join(root, filename)
+        elif has_magic(source):
+            for filename in sorted(iglob(source, recursive=True)):
+                if path.isfile(filename) and _is_image(filename):
+                    yield filename
+        else:
+            yield source
+
+
+def read_manifest(filename):
+    if not filename:
+        return set()
+    try:
+        with open(filename, encoding='utf-8') as f:
+            return {line.rstrip('\n') for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def recognize(filename, lang=None, config='', timeout=0):
+    """Returns the JSON Lines record of one image."""
+    result = {'path': filename, 'text': None, 'error': None}
+    with _record('batch') as record:
+        try:
+            result['text'] = image_to_string(
+                filename,
+                lang,
+                config,
+                timeout=timeout,
+            )
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+    result['seconds'] = record.total
+    result['stages'] = record.stages
+    return result
+
+
+def run_batch(
+    filenames,
+    output,
+    jobs=None,
+    manifest=None,
+    lang=None,
+    config='',
+    timeout=0,
+):
+    """
+    Recognizes the images with jobs parallel workers and writes a JSON line
+    to output for each as it completes. Returns the number of errors.
+    """
+    jobs = jobs or cpu_count() or 1
+    done = read_manifest(manifest)
+    manifest_file = open(manifest, 'a', encoding='utf-8') if manifest else None
+    errors = 0
+
+    def write(result):
+        nonlocal errors
+        output.write(json.dumps(result, ensure_ascii=False) + '\n')
+        output.flush()
+        if result['error']:
+            errors += 1
+        elif manifest_file:
+            manifest_file.write(path.abspath(result['path']) + '\n')
+            manifest_file.flush()
+
+    try:
+        with ThreadPoolExecutor(jobs) as executor:
+            running = set()
+            for filename in filenames:
+                key = path.abspath(filename)
+                if key in done:
+                    continue
+                done.add(key)
+                running.add(
+                    executor.submit(
+                        copy_context().run,
+                        recognize,
+                        filename,
+                        lang,
+                        config,
+                        timeout,
+                    ),
+                )
+                # keep a bounded number of queued images, so that huge
+                # listings are consumed as the work progresses
+                if len(running) >= jobs * 2:
+                    finished, running = wait(running, None, FIRST_COMPLETED)
+                    for future in finished:
+                        write(future.result())
+
+            for future in wait(running).done:
+                write(future.result())
+    finally:
+        if manifest_file:
+            manifest_file.close()
+    return errors
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog='pytesseract --batch',
+        description=__doc__.split('\n\n')[1],
+    )
+    parser.add_argument('inputs', nargs='+', metavar='input')
+    parser.add_argument('-l', '--lang')
+    parser.add_argument('-c', '--config', default='')
+    parser.add_argument('-j', '--jobs', type=int, default=cpu_count() or 1)
+    parser.add_argument('-t', '--timeout', type=float, default=0)
+    parser.add_argument(
+        '-m',
+        '--manifest',
+        help='file listing the images already done, updated as they are',
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='JSON Lines file to append to, instead of stdout',
+    )
+    args = parser.parse_args(argv)
+
+    output = (
+        open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    )
+    try:
+        errors = run_batch(
+            iter_inputs(args.inputs),
+            output,
+            args.jobs,
+            args.manifest,
+            args.lang,
+            args.config,
+            args.timeout,
+        )
+    finally:
+        if args.output:
+            output.close()
+    return 1 if errors else 0
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from os import cpu_count
+from os import extsep
+from threading import Event
+from time import monotonic
+
+from .pytesseract import _read_output
+from .pytesseract import DEFAULT_ENCODING
+from .pytesseract import EXTENTION_TO_CONFIG
+from .pytesseract import run_tesseract
+from .pytesseract import save
+from .pytesseract import STDOUT_EXTENSIONS
+from .timing import timed
+
+
+def default_scorer(output):
+    """Scores an output by its number of non-blank characters."""
+    return sum(not char.isspace() for char in output)
+
+
+class BestOf:
+    """Result of ocr_best_of(): the best output and what was tried."""
+
+    __slots__ = (
+        'output',
+        'candidate',
+        'score',
+        'results',
+        'errors',
+        'cancelled',
+        '_index',
+    )
+
+    def __init__(self):
+        self.output = None
+        self.candidate = None
+        self.score = None
+        # position of the best candidate, which wins ties
+        self._index = None
+        # (candidate, output, score) of every candidate that completed
+        self.results = []
+        # (candidate, exception) of every candidate that failed or timed out
+        self.errors = []
+        # candidates stopped because another one reached the threshold
+        self.cancelled = []
+
+    def __repr__(self):
+        return (
+            f'BestOf(candidate={self.candidate!r}, score={self.score!r}, '
+            f'results={len(self.results)}, errors={len(self.errors)}, '
+            f'cancelled={len(self.cancelled)})'
+        )
+
+    def add(self, candidate, output, score, index):
+        self.results.append((candidate, output, score))
+        if (
+            self.score is None
+            or score > self.score
+            or (score == self.score and index < self._index)
+        ):
+            self.output = output
+            self.candidate = candidate
+            self.score = score
+            self._index = index
+
+
+def _candidate(candidate):
+    if isinstance(candidate, dict):
+        return candidate
+    config, lang = candidate
+    return {'config': config, 'lang': lang}
+
+
+@timed
+def ocr_best_of(
+    image,
+    candidates,
+    deadline=None,
+    scorer=default_scorer,
+    extension='txt',
+    nice=0,
+    max_workers=None,
+    threshold=None,
+):
+    """
+    Runs Tesseract once per candidate and returns a BestOf with the output
+    the scorer rates highest; on equal scores, the candidate listed first
+    wins.
+
+    candidates are dicts with 'lang' and 'config' keys, or (config, lang)
+    pairs. The image is encoded once for all of them and up to max_workers
+    candidates run at the same time. extension may also be a list of
+    extensions, all produced by the same run: outputs are then lists in the
+    same order, e.g. ['txt', 'tsv'] for the text and its word boxes.
+
+    deadline is the number of seconds the whole call may take: candidates
+    still running when it passes are killed, the ones not started yet are
+    skipped, and the best output so far is returned. Once an output scores
+    at least threshold, the other candidates are cancelled the same way. If
+    no candidate completed, the first error is raised.
+    """
+    extensions = [extension] if isinstance(extension, str) else extension
+    for name in extensions:
+        if name not in STDOUT_EXTENSIONS:
+            raise ValueError(f'Unsupported extension: {name}')
+    if not extensions:
+        raise ValueError('No extensions')
+
+    candidates = [_candidate(candidate) for candidate in candidates]
+    if not candidates:
+        raise ValueError('No candidates')
+
+    end = monotonic() + deadline if deadline else None
+    extension_config = ' '.join(
+        EXTENTION_TO_CONFIG[name]
+        for name in extensions
+        if name in EXTENTION_TO_CONFIG
+    )
+    cancel = Event()
+    best = BestOf()
+
+    def run(temp_name, input_filename, candidate):
+        if cancel.is_set():
+            raise RuntimeError('Tesseract process cancelled')
+        timeout = 0
+        if end is not None:
+            timeout = end - monotonic()
+            if timeout <= 0:
+                raise RuntimeError('Tesseract process timeout')
+
+        config = candidate.get('config', '')
+        if extension_config:
+            config = f'-c {extension_config} {config.strip()}'
+        if isinstance(extension, str):
+            output = run_tesseract(
+                input_filename,
+                'stdout',
+                extension,
+                candidate.get('lang'),
+                config,
+                nice,
+                timeout,
+                cancel=cancel,
+            )
+            return output.decode(DEFAULT_ENCODING)
+
+        run_tesseract(
+            input_filename,
+            temp_name,
+            ' '.join(extensions),
+            candidate.get('lang'),
+            config,
+            nice,
+            timeout,
+            cancel=cancel,
+        )
+        return [
+            _read_output(f'{temp_name}{extsep}{name}') for name in extensions
+        ]
+
+    with save(image) as (temp_name, input_filename), ThreadPoolExecutor(
+        max_workers or min(len(candidates), cpu_count() or 1),
+        thread_name_prefix='tesseract-best-of',
+    ) as executor:
+        futures = {
+            executor.submit(
+                copy_context().run,
+                run,
+                # the outputs of every candidate, next to the image
+                f'{temp_name}_{index}',
+                input_filename,
+                candidate,
+            ): (index, candidate)
+            for index, candidate in enumerate(candidates)
+        }
+        # every run times out by itself at the deadline, so this returns
+        # once the last process has exited or been killed
+        for future in as_completed(futures):
+            index, candidate = futures[future]
+            try:
+                output = future.result()
+            except Exception as e:
+                if cancel.is_set():
+                    best.cancelled.append(candidate)
+                else:
+                    best.errors.append((candidate, e))
+                continue
+
+            score = scorer(output)
+            best.add(candidate, output, score, index)
+            if threshold is not None and score >= threshold:
+                cancel.set()
+
+    if not best.results:
+        raise best.errors[0][1]
+    return best
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+
+from PIL import Image
+
+from . import pytesseract as _tess
+from .pytesseract import _array_buffer
+from .pytesseract import count_frames
+from .pytesseract import get_tesseract_version
+from .pytesseract import pnm_header
+from .pytesseract import source_filename
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def _hash_file(filename, digest):
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+
+def hash_image(image):
+    """
+    Returns the sha256 digest of what Tesseract would be given for the image:
+    the file content of paths and untouched images opened from disk, the
+    raw buffer of 8-bit arrays, or the mode, size, format and pixel data of
+    any other image object. The image itself is left untouched: an alpha
+    channel is hashed as is, since prepare() always flattens it the same way.
+    """
+    digest = hashlib.sha256()
+    if isinstance(image, str):
+        _hash_file(image, digest)
+        return digest.digest()
+
+    if isinstance(image, Image.Image):
+        filename = source_filename(image)
+        if filename:
+            # hashing the file keeps the image unloaded for save()
+            _hash_file(filename, digest)
+            return digest.digest()
+
+    if _tess._is_ndarray(image):
+        header = pnm_header(image)
+        if header:
+            digest.update(header)
+            digest.update(_array_buffer(image))
+            return digest.digest()
+
+        image = Image.fromarray(image)
+
+    if not isinstance(image, Image.Image):
+        raise TypeError('Unsupported image object')
+    digest.update(f'{image.mode}:{image.size}:{image.format}:'.encode())
+    digest.update(image.tobytes())
+    return digest.digest()
+
+
+class OCRCache:
+    """
+    Content-addressed cache of Tesseract outputs.
+
+    Results of image_to_string, image_to_data, image_to_boxes and
+    image_to_osd are keyed on a hash of the prepared image plus the output
+    type, lang, config and Tesseract version. Entries live in an in-memory
+    LRU tier bounded by max_entries and max_bytes and, when directory is
+    set, in an on-disk tier shared between processes whose least recently
+    used files are evicted above max_disk_bytes.
+
+    Use it as a context manager, or call activate()/deactivate():
+
+        with OCRCache(directory='/var/cache/ocr'):
+            text = image_to_string(image)
+    """
+
+    def __init__(
+        self,
+        max_entries=1024,
+        max_bytes=64 << 20,
+        directory=None,
+        max_disk_bytes=1 << 30,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = None
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        self.activate()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.deactivate()
+
+    def activate(self):
+        """Makes run_and_get_output() and the image_to_* functions use it."""
+        _tess._active_cache = self
+
+    def deactivate(self):
+        if _tess._active_cache is self:
+            _tess._active_cache = None
+
+    def make_key(self, image, extension, lang, config):
+        """Returns the cache key, or None if the input can't be cached."""
+        if isinstance(image, str) and count_frames(image) is None:
+            # image list files reference content the hash can't see
+            return None
+
+        digest = hashlib.sha256(hash_image(image))
+        version = get_tesseract_version(cached=True)
+        digest.update(f'\0{extension}\0{lang}\0{config}\0{version}'.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            output = self._entries.get(key)
+            if output is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return output
+
+        output = self._disk_get(key)
+        with self._lock:
+            if output is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._memory_put(key, output)
+        return output
+
+    def put(self, key, output):
+        with self._lock:
+            self._memory_put(key, output)
+        self._disk_put(key, output)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def _memory_put(self, key, output):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+
+        if len(output) > self.max_bytes:
+            return
+
+        self._entries[key] = output
+        self._bytes += len(output)
+        while (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _disk_get(self, key):
+        if not self.directory:
+            return None
+
+        filename = self._disk_path(key)
+        try:
+            with open(filename, 'rb') as f:
+                output = f.read()
+            # the mtime doubles as the last access time for eviction
+            os.utime(filename)
+        except OSError:
+            return None
+        return output
+
+    def _disk_put(self, key, output):
+        if not self.directory or len(output) > self.max_disk_bytes:
+            return
+
+        filename = self._disk_path(key)
+        f = None
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with NamedTemporaryFile(
+                dir=os.path.dirname(filename),
+                prefix='.tmp_',
+                delete=False,
+            ) as f:
+                f.write(output)
+            os.replace(f.name, filename)
+        except OSError:
+            # a full or read-only disk only loses the disk tier
+            if f is not None:
+                try:
+                    os.remove(f.name)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(
+                    size for _, size, _ in self._disk_entries()
+                )
+            else:
+                self._disk_bytes += len(output)
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            self._disk_evict()
+
+    def _disk_entries(self):
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.startswith('.tmp_'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _disk_evict(self):
+        # other processes may share the directory, so start from its
+        # actual content and drop the least recently used files first
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self._stats['disk_evictions'] += 1
+        self._disk_bytes = total
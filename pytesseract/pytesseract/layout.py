@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+Incremental hOCR and ALTO parsers into a compact Page/Block/Line/Word model.
+
+The documents are read with iterparse and every element is dropped as soon
+as it has been converted, so only the page being parsed is held in memory.
+The text of a page is stored once, in Page.text: words, lines and blocks
+only keep their offsets into it.
+"""
+from __future__ import annotations
+
+import re
+from io import BytesIO
+from xml.etree.ElementTree import iterparse
+
+from .timing import stage
+
+BBOX_PATTERN = re.compile(r'\bbbox\s+(-?\d+)\s+(-?\d+)\s+(-?\d+)\s+(-?\d+)')
+BASELINE_PATTERN = re.compile(r'\bbaseline\s+(-?[\d.]+)\s+(-?[\d.]+)')
+WCONF_PATTERN = re.compile(r'\bx_wconf\s+(-?[\d.]+)')
+
+HOCR_LINE_CLASSES = {'ocr_line', 'ocr_textfloat', 'ocr_header', 'ocr_caption'}
+
+
+class Page:
+    __slots__ = ('page_num', 'bbox', 'blocks', 'text')
+
+    def __init__(self, page_num, bbox):
+        self.page_num = page_num
+        self.bbox = bbox
+        self.blocks = []
+        self.text = ''
+
+    def __repr__(self):
+        return f'Page(page_num={self.page_num}, bbox={self.bbox})'
+
+    @property
+    def lines(self):
+        return [line for block in self.blocks for line in block.lines]
+
+    @property
+    def words(self):
+        return [word for line in self.lines for word in line.words]
+
+
+class Block:
+    __slots__ = ('page', 'bbox', 'lines')
+
+    def __init__(self, page, bbox):
+        self.page = page
+        self.bbox = bbox
+        self.lines = []
+
+    def __repr__(self):
+        return f'Block(bbox={self.bbox}, text={self.text!r})'
+
+    @property
+    def text(self):
+        words = [word for line in self.lines for word in line.words]
+        if not words:
+            return ''
+        return self.page.text[words[0].start : words[-1].end]
+
+
+class Line:
+    __slots__ = ('page', 'bbox', 'baseline', 'words')
+
+    def __init__(self, page, bbox, baseline=None):
+        self.page = page
+        self.bbox = bbox
+        self.baseline = baseline
+        self.words = []
+
+    def __repr__(self):
+        return f'Line(bbox={self.bbox}, text={self.text!r})'
+
+    @property
+    def text(self):
+        if not self.words:
+            return ''
+        return self.page.text[self.words[0].start : self.words[-1].end]
+
+
+class Word:
+    __slots__ = ('page', 'start', 'end', 'bbox', 'conf')
+
+    def __init__(self, page, start, end, bbox, conf):
+        self.page = page
+        self.start = start
+        self.end = end
+        self.bbox = bbox
+        self.conf = conf
+
+    def __repr__(self):
+        return f'Word(bbox={self.bbox}, conf={self.conf}, text={self.text!r})'
+
+    @property
+    def text(self):
+        return self.page.text[self.start : self.end]
+
+
+class _PageBuilder:
+    """Collects the text of a page in one buffer while it is parsed."""
+
+    def __init__(self, page_num, bbox):
+        self.page = Page(page_num, bbox)
+        self.parts = []
+        self.offset = 0
+        self.block = None
+        self.line = None
+
+    def _append(self, text):
+        self.parts.append(text)
+        self.offset += len(text)
+
+    def start_block(self, bbox):
+        if self.page.blocks and self.offset:
+            self._append('\n\n')
+        self.block = Block(self.page, bbox)
+        self.page.blocks.append(self.block)
+        self.line = None
+
+    def start_line(self, bbox, baseline=None):
+        if self.block is None:
+            self.start_block(bbox)
+        if self.block.lines:
+            self._append('\n')
+        self.line = Line(self.page, bbox, baseline)
+        self.block.lines.append(self.line)
+
+    def add_word(self, text, bbox, conf):
+        if self.line is None:
+            self.start_line(bbox)
+        if self.line.words:
+            self._append(' ')
+        start = self.offset
+        self._append(text)
+        self.line.words.append(Word(self.page, start, self.offset, bbox, conf))
+
+    def finish(self):
+        self.page.text = ''.join(self.parts)
+        return self.page
+
+
+def _source(document):
+    if isinstance(document, (bytes, bytearray)):
+        return BytesIO(document)
+    return document
+
+
+def _local_name(tag):
+    return tag.rpartition('}')[2]
+
+
+def _hocr_bbox(title):
+    match = BBOX_PATTERN.search(title)
+    return tuple(map(int, match.groups())) if match else None
+
+
+def _hocr_baseline(title):
+    match = BASELINE_PATTERN.search(title)
+    return tuple(map(float, match.groups())) if match else None
+
+
+def _hocr_conf(title):
+    match = WCONF_PATTERN.search(title)
+    return float(match.group(1)) if match else None
+
+
+def iter_hocr_pages(document):
+    """
+    Yields a Page for every ocr_page of an hOCR document (bytes, a file name
+    or a binary file object) as soon as the page has been parsed
+    """
+    builder = None
+    page = None
+    word = None
+    page_num = 0
+    for event, element in iterparse(_source(document), ('start', 'end')):
+        if event == 'end':
+            if element is word:
+                # the text may be wrapped in <strong> or <em>
+                title = element.get('title', '')
+                builder.add_word(
+                    ''.join(element.itertext()).strip(),
+                    _hocr_bbox(title),
+                    _hocr_conf(title),
+                )
+                word = None
+                element.clear()
+            elif element is page:
+                yield builder.finish()
+                builder = page = None
+                element.clear()
+            continue
+
+        if word is not None:
+            continue
+
+        classes = element.get('class', '').split()
+        title = element.get('title', '')
+        if 'ocr_page' in classes:
+            page_num += 1
+            page = element
+            builder = _PageBuilder(page_num, _hocr_bbox(title))
+        elif builder is None:
+            continue
+        elif 'ocr_carea' in classes:
+            builder.start_block(_hocr_bbox(title))
+        elif HOCR_LINE_CLASSES.intersection(classes):
+            builder.start_line(_hocr_bbox(title), _hocr_baseline(title))
+        elif 'ocrx_word' in classes:
+            word = element
+
+
+def _alto_bbox(element):
+    try:
+        left = int(float(element.get('HPOS')))
+        top = int(float(element.get('VPOS')))
+        width = int(float(element.get('WIDTH')))
+        height = int(float(element.get('HEIGHT')))
+    except (TypeError, ValueError):
+        return None
+    return left, top, left + width, top + height
+
+
+def _alto_conf(element):
+    try:
+        # word confidence from 0 (unsure) to 1 (sure)
+        return float(element.get('WC')) * 100
+    except (TypeError, ValueError):
+        return None
+
+
+def _alto_baseline(element):
+    try:
+        return float(element.get('BASELINE'))
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_alto_pages(document):
+    """
+    Yields a Page for every Page of an ALTO XML document (bytes, a file name
+    or a binary file object) as soon as the page has been parsed
+    """
+    builder = None
+    page_num = 0
+    for event, element in iterparse(_source(document), ('start', 'end')):
+        name = _local_name(element.tag)
+        if event == 'start':
+            if name == 'Page':
+                page_num += 1
+                try:
+                    bbox = (
+                        0,
+                        0,
+                        int(float(element.get('WIDTH'))),
+                        int(float(element.get('HEIGHT'))),
+                    )
+                except (TypeError, ValueError):
+                    bbox = None
+                builder = _PageBuilder(page_num, bbox)
+            elif builder is None:
+                continue
+            elif name == 'TextBlock':
+                builder.start_block(_alto_bbox(element))
+            elif name == 'TextLine':
+                builder.start_line(
+                    _alto_bbox(element),
+                    _alto_baseline(element),
+                )
+            continue
+
+        if builder is None:
+            continue
+        if name == 'String':
+            builder.add_word(
+                element.get('CONTENT', ''),
+                _alto_bbox(element),
+                _alto_conf(element),
+            )
+            element.clear()
+        elif name == 'TextLine':
+            element.clear()
+        elif name == 'Page':
+            yield builder.finish()
+            builder = None
+            element.clear()
+
+
+@stage('parse')
+def parse_hocr(document):
+    """Returns the list of Pages of an hOCR document."""
+    return list(iter_hocr_pages(document))
+
+
+@stage('parse')
+def parse_alto(document):
+    """Returns the list of Pages of an ALTO XML document."""
+    return list(iter_alto_pages(document))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+from PIL import Image
+
+from .pytesseract import _is_ndarray
+from .pytesseract import image_to_osd
+from .pytesseract import Output
+from .pytesseract import TesseractError
+from .timing import stage
+from .timing import timed
+
+# longest side of the copy OSD runs on: enough for Tesseract to find text
+# lines on a page, and a fraction of the pixels of a phone photo
+OSD_MAX_SIDE = 1600
+# below this, Tesseract is guessing and the image is left as it is
+MIN_ORIENTATION_CONF = 2.0
+
+# clockwise rotations as PIL transpositions, which are counterclockwise
+ROTATIONS = {
+    90: Image.ROTATE_270,
+    180: Image.ROTATE_180,
+    270: Image.ROTATE_90,
+}
+
+
+def osd_thumbnail(image, max_side=OSD_MAX_SIDE):
+    """
+    Returns a grayscale copy of the image no larger than max_side. Files are
+    decoded at reduced size when the format allows it (JPEG).
+    """
+    with stage('encode'):
+        if isinstance(image, str):
+            with Image.open(image) as opened:
+                opened.draft('L', (max_side, max_side))
+                thumbnail = opened.convert('L')
+        elif _is_ndarray(image):
+            thumbnail = Image.fromarray(image).convert('L')
+        elif isinstance(image, Image.Image):
+            thumbnail = image.convert('L')
+        else:
+            raise TypeError('Unsupported image object')
+        thumbnail.thumbnail((max_side, max_side))
+    return thumbnail
+
+
+@timed
+def detect_orientation(
+    image,
+    max_side=OSD_MAX_SIDE,
+    config='',
+    nice=0,
+    timeout=0,
+):
+    """
+    Runs orientation and script detection on a downscaled copy of the image
+    and returns its dict (see image_to_osd), or None if Tesseract found too
+    little text to tell.
+    """
+    try:
+        return image_to_osd(
+            osd_thumbnail(image, max_side),
+            config=config,
+            nice=nice,
+            output_type=Output.DICT,
+            timeout=timeout,
+        )
+    except TesseractError:
+        return None
+
+
+def rotate(image, degrees):
+    """
+    Rotates a PIL image or a numpy array clockwise by a multiple of 90
+    degrees, without resampling.
+    """
+    degrees %= 360
+    if not degrees:
+        return image
+    if degrees not in ROTATIONS:
+        raise ValueError(f'Unsupported rotation: {degrees}')
+    if _is_ndarray(image):
+        import numpy as np
+
+        # rot90 returns a view, OpenCV needs contiguous arrays
+        return np.ascontiguousarray(np.rot90(image, -degrees // 90))
+    return image.transpose(ROTATIONS[degrees])
+
+
+@timed
+def auto_rotate(
+    image,
+    max_side=OSD_MAX_SIDE,
+    min_confidence=MIN_ORIENTATION_CONF,
+    config='',
+    nice=0,
+    timeout=0,
+):
+    """
+    Returns (image, osd): the image turned upright according to
+    detect_orientation(), and the OSD dict (None if detection failed).
+
+    The image is only rotated when the orientation confidence reaches
+    min_confidence; file names are opened only if they need rotating.
+    """
+    osd = detect_orientation(image, max_side, config, nice, timeout)
+    if (
+        osd is None
+        or not osd.get('rotate')
+        or osd.get('orientation_conf', 0) < min_confidence
+    ):
+        return image, osd
+
+    if isinstance(image, str):
+        with Image.open(image) as opened:
+            opened.load()
+            return rotate(opened, osd['rotate']), osd
+    return rotate(image, osd['rotate']), osd
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+import subprocess
+import threading
+from concurrent.futures import Future
+from contextvars import copy_context
+from os import cpu_count
+from time import monotonic
+
+from . import pytesseract as _tess
+from .pytesseract import _run_and_get_batch_output
+from .pytesseract import _run_and_get_output
+from .pytesseract import BATCH_EXTENSIONS
+from .pytesseract import count_pages
+from .pytesseract import DEFAULT_ENCODING
+from .pytesseract import LOGGER
+from .pytesseract import TesseractNotFoundError
+
+
+class _Job:
+    __slots__ = (
+        'image',
+        'extension',
+        'lang',
+        'config',
+        'nice',
+        'timeout',
+        'return_bytes',
+        'stream',
+        'pages',
+        'future',
+        'context',
+    )
+
+    def __init__(
+        self,
+        image,
+        extension,
+        lang,
+        config,
+        nice,
+        timeout,
+        return_bytes,
+        stream,
+    ):
+        self.image = image
+        self.extension = extension
+        self.lang = lang
+        self.config = config
+        self.nice = nice
+        self.timeout = timeout
+        self.return_bytes = return_bytes
+        self.stream = stream
+        self.pages = (
+            count_pages(image) if extension in BATCH_EXTENSIONS else None
+        )
+        self.future = Future()
+        # carries the caller's timing record into the worker thread
+        self.context = copy_context()
+
+    @property
+    def key(self):
+        return self.extension, self.lang, self.config, self.nice, self.timeout
+
+    def run(self):
+        return self.context.run(self._run)
+
+    def _run(self):
+        return _run_and_get_output(
+            self.image,
+            self.extension,
+            self.lang,
+            self.config,
+            self.nice,
+            self.timeout,
+            self.return_bytes,
+            self.stream,
+        )
+
+
+class _Worker:
+    __slots__ = ('thread', 'lang', 'jobs')
+
+    def __init__(self):
+        self.thread = None
+        self.lang = None
+        self.jobs = 0
+
+
+class TesseractPool:
+    """
+    Pool of long-lived worker threads that run Tesseract on behalf of the
+    image_to_* functions.
+
+    Every worker has an affinity to the language it last ran. Jobs queued
+    for the same language, output and config are coalesced into a single
+    Tesseract invocation over an image list file, so the language model is
+    loaded once for the whole batch instead of once per image (jobs with a
+    timeout, multi-frame files and image list files always run alone).
+    Workers are retired and replaced after max_jobs jobs, and the binary is
+    probed every health_check_interval seconds.
+
+    Use it as a context manager, or call start()/activate() explicitly:
+
+        with TesseractPool(size=4):
+            text = image_to_string(image, lang='fra+eng')
+    """
+
+    def __init__(
+        self,
+        size=None,
+        max_jobs=200,
+        max_batch_size=8,
+        health_check_interval=60,
+    ):
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+
+        self.size = size or cpu_count() or 1
+        self.max_jobs = max_jobs
+        self.max_batch_size = max_batch_size
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition()
+        self._queues = {}
+        self._workers = set()
+        self._worker_threads = set()
+        self._closed = True
+        self._healthy = None
+        self._last_health_check = 0.0
+        self._stats = {
+            'jobs': 0,
+            'batches': 0,
+            'batched_jobs': 0,
+            'recycled_workers': 0,
+        }
+
+    def __enter__(self):
+        self.start()
+        self.activate()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.deactivate()
+        self.shutdown()
+
+    def start(self):
+        with self._cond:
+            if not self._closed:
+                return self
+            self._closed = False
+
+        if not self.check_health():
+            self._closed = True
+            raise TesseractNotFoundError()
+
+        with self._cond:
+            for _ in range(self.size):
+                self._spawn_worker()
+        return self
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = [worker.thread for worker in self._workers]
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def activate(self):
+        """Routes run_and_get_output() and the image_to_* functions here."""
+        _tess._active_pool = self
+
+    def deactivate(self):
+        if _tess._active_pool is self:
+            _tess._active_pool = None
+
+    def owns_current_thread(self):
+        return threading.current_thread() in self._worker_threads
+
+    def check_health(self):
+        """Probes the Tesseract binary and records the result."""
+        try:
+            subprocess.run(
+                [_tess.tesseract_cmd, '--version'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                timeout=10,
+                check=True,
+            )
+            healthy = True
+        except (OSError, subprocess.SubprocessError):
+            healthy = False
+
+        self._healthy = healthy
+        self._last_health_check = monotonic()
+        return healthy
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                self._stats,
+                healthy=self._healthy,
+                workers=len(self._workers),
+                queued=sum(len(queue) for queue in self._queues.values()),
+            )
+
+    def submit(
+        self,
+        image,
+        extension='',
+        lang=None,
+        config='',
+        nice=0,
+        timeout=0,
+        return_bytes=False,
+        stream=None,
+    ):
+        job = _Job(
+            image,
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+            return_bytes,
+            stream,
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('TesseractPool is not running')
+            self._queues.setdefault(lang, []).append(job)
+            self._stats['jobs'] += 1
+            self._cond.notify()
+        return job.future
+
+    def run(self, *args, **kwargs):
+        """Same signature and result as run_and_get_output()."""
+        return self.submit(*args, **kwargs).result()
+
+    def _spawn_worker(self):
+        worker = _Worker()
+        worker.thread = threading.Thread(
+            target=self._work,
+            args=(worker,),
+            name='tesseract-pool',
+            daemon=True,
+        )
+        self._workers.add(worker)
+        self._worker_threads.add(worker.thread)
+        worker.thread.start()
+
+    def _take_batch(self, worker):
+        lang = worker.lang
+        if not self._queues.get(lang):
+            lang = max(self._queues, key=lambda k: len(self._queues[k]))
+            worker.lang = lang
+
+        queue = self._queues[lang]
+        first = queue.pop(0)
+        batch = [first]
+        # a batch that fails is rerun one job at a time, so jobs with a
+        # timeout run alone to keep waiting within their own timeout
+        if first.pages is not None and not first.timeout:
+            for job in list(queue):
+                if len(batch) >= self.max_batch_size:
+                    break
+                if job.pages is not None and job.key == first.key:
+                    queue.remove(job)
+                    batch.append(job)
+
+        if not queue:
+            del self._queues[lang]
+        return batch
+
+    def _work(self, worker):
+        while True:
+            with self._cond:
+                while not self._closed and not self._queues:
+                    self._cond.wait()
+                if not self._queues:
+                    return
+                batch = self._take_batch(worker)
+
+            batch = [
+                job
+                for job in batch
+                if job.future.set_running_or_notify_cancel()
+            ]
+            if batch:
+                self._execute(batch)
+
+            worker.jobs += len(batch)
+            if worker.jobs >= self.max_jobs:
+                with self._cond:
+                    self._workers.discard(worker)
+                    self._worker_threads.discard(worker.thread)
+                    self._stats['recycled_workers'] += 1
+                    if not self._closed:
+                        self._spawn_worker()
+                return
+
+    def _execute(self, batch):
+        if (
+            self.health_check_interval
+            and monotonic() - self._last_health_check
+            > self.health_check_interval
+            and not self.check_health()
+        ):
+            for job in batch:
+                job.future.set_exception(TesseractNotFoundError())
+            return
+
+        if len(batch) > 1:
+            try:
+                outputs = self._run_batch(batch)
+            except Exception as e:
+                # Fall back to one run per image so that every job gets
+                # its own result, error or timeout
+                LOGGER.debug('Batch of %d failed: %r', len(batch), e)
+            else:
+                for job, output in zip(batch, outputs):
+                    job.future.set_result(
+                        output
+                        if job.return_bytes
+                        else output.decode(DEFAULT_ENCODING),
+                    )
+                return
+
+        for job in batch:
+            try:
+                job.future.set_result(job.run())
+            except BaseException as e:
+                job.future.set_exception(e)
+
+    def _run_batch(self, batch):
+        extension, lang, config, nice, _ = batch[0].key
+        with self._cond:
+            self._stats['batches'] += 1
+            self._stats['batched_jobs'] += len(batch)
+
+        return _run_and_get_batch_output(
+            [job.image for job in batch],
+            [job.pages for job in batch],
+            extension,
+            lang,
+            config,
+            nice,
+        )
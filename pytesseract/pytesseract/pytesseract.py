@@ -1,26 +1,45 @@
 #!/usr/bin/env python
 from __future__ import annotations
 
+import json
 import logging
 import re
 import shlex
 import string
 import subprocess
 import sys
+from array import array
 from contextlib import contextmanager
+from contextlib import ExitStack
 from csv import QUOTE_NONE
 from errno import ENOENT
 from functools import wraps
-from glob import iglob
+from importlib import import_module
+from importlib.util import find_spec
 from io import BytesIO
+from operator import methodcaller
+from os import access
 from os import environ
 from os import extsep
 from os import linesep
+from os import makedirs
+from os import path
+from os import replace
 from os import remove
+from os import rmdir
+from os import scandir
+from os import stat
+from os import W_OK
+from os.path import getsize
+from os.path import isfile
 from os.path import normcase
 from os.path import normpath
 from os.path import realpath
+from shutil import disk_usage
+from shutil import which
+from tempfile import mkdtemp
 from tempfile import NamedTemporaryFile
+from time import monotonic
 from time import sleep
 
 from packaging.version import InvalidVersion
@@ -28,28 +47,71 @@ from packaging.version import parse
 from packaging.version import Version
 from PIL import Image
 
+from .admission import omp_thread_limit
+from .admission import slot
+from .layout import parse_alto
+from .layout import parse_hocr
+from .timing import add_bytes_out
+from .timing import describe
+from .timing import stage
+from .timing import timed
+
 
 tesseract_cmd = 'tesseract'
+# pipe images through stdin/stdout instead of temp files by default
+stream_mode = False
+
+# numpy and pandas are only imported once an ndarray or DataFrame is used
+numpy_installed = find_spec('numpy') is not None
+pandas_installed = find_spec('pandas') is not None
+
+# the result of get_tesseract_version(cached=True) is kept there, per
+# Tesseract binary; set it to None to disable the on-disk cache
+probe_cache_dir = environ.get('PYTESSERACT_CACHE_DIR') or path.join(
+    environ.get('XDG_CACHE_HOME') or path.join(path.expanduser('~'), '.cache'),
+    'pytesseract',
+)
+
+# where save() writes images and Tesseract its output files; None uses
+# RAM_TEMP_DIR when it is available and the default temp dir otherwise
+temp_dir = environ.get('PYTESSERACT_TMPDIR') or None
+# images larger than this (uncompressed) go to the default temp dir, so a
+# huge scan can't exhaust the shared memory
+ram_temp_max_bytes = 64 * 1024 * 1024
 
-try:
-    from numpy import ndarray
+LOGGER = logging.getLogger('pytesseract')
 
-    numpy_installed = True
-except ModuleNotFoundError:
-    numpy_installed = False
 
-try:
-    import pandas as pd
+def __getattr__(name):
+    # np, ndarray and pd used to be imported along with this module
+    if name == 'np' and numpy_installed:
+        return import_module('numpy')
+    if name == 'ndarray' and numpy_installed:
+        return import_module('numpy').ndarray
+    if name == 'pd' and pandas_installed:
+        return import_module('pandas')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-    pandas_installed = True
-except ModuleNotFoundError:
-    pandas_installed = False
 
-LOGGER = logging.getLogger('pytesseract')
+def _is_ndarray(image):
+    # an ndarray can only exist once numpy has been imported by someone
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(image, numpy.ndarray)
+
+
+# set by TesseractPool.activate(); run_and_get_output() routes through it
+_active_pool = None
+# set by OCRCache.activate(); run_and_get_output() looks results up in it
+_active_cache = None
 
 DEFAULT_ENCODING = 'utf-8'
+# seconds between two checks of the cancel event of a running process
+CANCEL_POLL_INTERVAL = 0.05
+RAM_TEMP_DIR = '/dev/shm'
 LANG_PATTERN = re.compile('^[a-z0-9_]+$')
 RGB_MODE = 'RGB'
+# modes written uncompressed as PBM/PGM/PPM instead of being PNG encoded
+PNM_MODES = {'1', 'L', 'RGB'}
 SUPPORTED_FORMATS = {
     'JPEG',
     'JPEG2000',
@@ -79,6 +141,19 @@ EXTENTION_TO_CONFIG = {
     'tsv': 'tessedit_create_tsv=1',
 }
 
+# outputs Tesseract can write on its own to stdout
+STDOUT_EXTENSIONS = {'box', 'hocr', 'osd', 'pdf', 'tsv', 'txt', 'xml'}
+
+# outputs of the image_to_* functions that are kept by OCRCache
+CACHEABLE_EXTENSIONS = {'box', 'osd', 'tsv', 'txt'}
+
+# outputs that can be split back into pages after a multi-image run
+BATCH_EXTENSIONS = {'box', 'tsv', 'txt'}
+PAGE_SEPARATOR = b'\f'
+
+INT32_MIN = -(2**31)
+INT32_MAX = 2**31 - 1
+
 TESSERACT_MIN_VERSION = Version('3.05')
 TESSERACT_ALTO_VERSION = Version('4.1.0')
 
@@ -87,7 +162,9 @@ class Output:
     BYTES = 'bytes'
     DATAFRAME = 'data.frame'
     DICT = 'dict'
+    NUMPY = 'numpy'
     STRING = 'string'
+    WORDS = 'words'
 
 
 class PandasNotSupported(EnvironmentError):
@@ -95,6 +172,11 @@ class PandasNotSupported(EnvironmentError):
         super().__init__('Missing pandas package')
 
 
+class NumpyNotSupported(EnvironmentError):
+    def __init__(self):
+        super().__init__('Missing numpy package')
+
+
 class TesseractError(RuntimeError):
     def __init__(self, status, message):
         self.status = status
@@ -137,16 +219,47 @@ def kill(process, code):
         process.returncode = code
 
 
+def _communicate(proc, seconds, input, cancel):
+    """
+    Returns proc.communicate(), killing the process and raising RuntimeError
+    as soon as cancel (a threading.Event) is set
+    """
+    end = monotonic() + seconds if seconds else None
+    while True:
+        if cancel.is_set():
+            kill(proc, -1)
+            raise RuntimeError('Tesseract process cancelled')
+
+        step = CANCEL_POLL_INTERVAL
+        if end is not None:
+            step = max(0, min(step, end - monotonic()))
+        try:
+            # communicate() can be resumed after a timeout without losing
+            # any output
+            return proc.communicate(input, timeout=step)
+        except subprocess.TimeoutExpired:
+            if end is not None and monotonic() >= end:
+                raise
+
+
 @contextmanager
-def timeout_manager(proc, seconds=None):
+def timeout_manager(proc, seconds=None, input=None, cancel=None):
+    """Yields the (stdout, stderr) data of the finished process."""
     try:
+        if cancel is not None:
+            try:
+                yield _communicate(proc, seconds, input, cancel)
+            except subprocess.TimeoutExpired:
+                kill(proc, -1)
+                raise RuntimeError('Tesseract process timeout')
+            return
+
         if not seconds:
-            yield proc.communicate()[1]
+            yield proc.communicate(input)
             return
 
         try:
-            _, error_string = proc.communicate(timeout=seconds)
-            yield error_string
+            yield proc.communicate(input, timeout=seconds)
         except subprocess.TimeoutExpired:
             kill(proc, -1)
             raise RuntimeError('Tesseract process timeout')
@@ -156,41 +269,158 @@ def timeout_manager(proc, seconds=None):
         proc.stderr.close()
 
 
+DISK_CACHED_PROBES = ('get_tesseract_version',)
+
+
 def run_once(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if not kwargs.pop('cached', False) or wrapper._result is wrapper:
+        if not kwargs.pop('cached', False):
             wrapper._result = func(*args, **kwargs)
+        elif wrapper._result is wrapper:
+            wrapper._result = _cached_probe(func, args, kwargs)
         return wrapper._result
 
     wrapper._result = wrapper
     return wrapper
 
 
+def _probe_key(func, args, kwargs):
+    """
+    Returns the on-disk cache key of a probe: the Tesseract binary path, size
+    and mtime and the arguments, or None if the result isn't kept on disk
+    """
+    # only the version depends on the binary alone: the languages change as
+    # soon as a traineddata file is added, and stay cached in memory only
+    if not probe_cache_dir or func.__name__ not in DISK_CACHED_PROBES:
+        return None
+
+    binary = which(tesseract_cmd)
+    if not binary:
+        return None
+    binary = realpath(binary)
+    try:
+        info = stat(binary)
+    except OSError:
+        return None
+
+    return json.dumps(
+        [
+            func.__name__,
+            binary,
+            info.st_size,
+            info.st_mtime_ns,
+            args,
+            sorted(kwargs.items()),
+        ],
+    )
+
+
+def _read_probe_cache(filename):
+    try:
+        with open(filename, encoding=DEFAULT_ENCODING) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cached_probe(func, args, kwargs):
+    """Calls func, or reuses its result from a previous process."""
+    try:
+        key = _probe_key(func, args, kwargs)
+    except TypeError:  # arguments that don't serialize
+        key = None
+    if key is None:
+        return func(*args, **kwargs)
+
+    filename = path.join(probe_cache_dir, 'probes.json')
+    entries = _read_probe_cache(filename)
+    if key in entries:
+        result = entries[key]
+        if isinstance(result, dict):
+            return Version(result['version'])
+        return result
+
+    result = func(*args, **kwargs)
+    entries[key] = (
+        {'version': str(result)} if isinstance(result, Version) else result
+    )
+    try:
+        makedirs(probe_cache_dir, exist_ok=True)
+        with NamedTemporaryFile(
+            'w',
+            dir=probe_cache_dir,
+            prefix='.tmp_',
+            delete=False,
+            encoding=DEFAULT_ENCODING,
+        ) as f:
+            json.dump(entries, f)
+        replace(f.name, filename)
+    except OSError as e:
+        LOGGER.debug('Could not write the probe cache: %r', e)
+    return result
+
+
 def get_errors(error_string):
     return ' '.join(
         line for line in error_string.decode(DEFAULT_ENCODING).splitlines()
     ).strip()
 
 
-def cleanup(temp_name):
-    """Tries to remove temp files by filename wildcard path."""
-    for filename in iglob(f'{temp_name}*' if temp_name else temp_name):
+def _temp_size(image):
+    """Returns an upper bound of what save() and Tesseract write for image."""
+    if isinstance(image, str):
+        # outputs such as pdf embed the image
         try:
-            remove(filename)
-        except OSError as e:
-            if e.errno != ENOENT:
-                raise
+            return getsize(image)
+        except OSError:
+            return 0
+    if _is_ndarray(image):
+        return image.nbytes
+    if isinstance(image, Image.Image):
+        return image.width * image.height * len(image.getbands())
+    return 0
+
+
+def _temp_dir(image):
+    if temp_dir is not None:
+        return temp_dir
+
+    size = _temp_size(image)
+    if size > ram_temp_max_bytes or not access(RAM_TEMP_DIR, W_OK):
+        return None
+    try:
+        free = disk_usage(RAM_TEMP_DIR).free
+    except OSError:
+        return None
+    # leave room for the outputs, and for everyone else using it
+    if free < 4 * size:
+        return None
+    return RAM_TEMP_DIR
+
+
+def _remove_temp_dir(dirname):
+    """Removes a save() directory with the files Tesseract wrote in it."""
+    try:
+        with scandir(dirname) as entries:
+            for entry in entries:
+                remove(entry.path)
+        rmdir(dirname)
+    except OSError as e:
+        if e.errno != ENOENT:
+            raise
 
 
 def prepare(image):
-    if numpy_installed and isinstance(image, ndarray):
+    if _is_ndarray(image):
         image = Image.fromarray(image)
 
     if not isinstance(image, Image.Image):
         raise TypeError('Unsupported image object')
 
-    extension = 'PNG' if not image.format else image.format
+    extension = image.format or (
+        'PPM' if image.mode in PNM_MODES else 'PNG'
+    )
     if extension not in SUPPORTED_FORMATS:
         raise TypeError('Unsupported image format/type')
 
@@ -199,24 +429,91 @@ def prepare(image):
         background = Image.new(RGB_MODE, image.size, (255, 255, 255))
         background.paste(image, (0, 0), image.getchannel('A'))
         image = background
+        extension = 'PPM'
 
     image.format = extension
     return image, extension
 
 
+def source_filename(image):
+    """
+    Returns the path of an image object opened from disk that is still
+    untouched, so Tesseract can read the file instead of a re-encoded copy.
+    """
+    filename = getattr(image, 'filename', None)
+    if (
+        not filename
+        or not isinstance(filename, str)
+        or image.format not in SUPPORTED_FORMATS
+        # pixel data is only loaded (and so possibly modified) once the
+        # tile list has been consumed
+        or not getattr(image, 'tile', None)
+        or 'A' in image.getbands()
+        or getattr(image, 'is_animated', False)
+        or not isfile(filename)
+    ):
+        return None
+    return realpath(normpath(normcase(filename)))
+
+
+def pnm_header(image):
+    """
+    Returns the PGM/PPM header for 8-bit grayscale or RGB arrays, whose
+    buffer can then be written as is, or None for any other array.
+    """
+    if image.dtype != 'uint8':
+        return None
+
+    if image.ndim == 2 or (image.ndim == 3 and image.shape[2] == 1):
+        magic = b'P5'
+    elif image.ndim == 3 and image.shape[2] == 3:
+        magic = b'P6'
+    else:
+        return None
+
+    height, width = image.shape[:2]
+    return b'%s\n%d %d\n255\n' % (magic, width, height)
+
+
+def _array_buffer(image):
+    return image.data if image.flags.c_contiguous else image.tobytes()
+
+
 @contextmanager
 def save(image):
+    """
+    Yields (temp_name, input_filename): the base name of the output files,
+    in a directory of its own that is removed afterwards, and the image file
+    to give Tesseract.
+    """
+    dirname = mkdtemp(prefix='tess_', dir=_temp_dir(image))
+    temp_name = path.join(dirname, 'tess')
     try:
-        with NamedTemporaryFile(prefix='tess_', delete=False) as f:
-            if isinstance(image, str):
-                yield f.name, realpath(normpath(normcase(image)))
+        if isinstance(image, str):
+            yield temp_name, realpath(normpath(normcase(image)))
+            return
+
+        if isinstance(image, Image.Image):
+            filename = source_filename(image)
+            if filename:
+                yield temp_name, filename
                 return
-            image, extension = prepare(image)
-            input_file_name = f'{f.name}_input{extsep}{extension}'
-            image.save(input_file_name, format=image.format)
-            yield f.name, input_file_name
+
+        header = pnm_header(image) if _is_ndarray(image) else None
+        with stage('encode'):
+            if header:
+                extension = 'ppm' if header.startswith(b'P6') else 'pgm'
+                input_file_name = f'{temp_name}_input{extsep}{extension}'
+                with open(input_file_name, 'wb') as input_file:
+                    input_file.write(header)
+                    input_file.write(_array_buffer(image))
+            else:
+                image, extension = prepare(image)
+                input_file_name = f'{temp_name}_input{extsep}{extension}'
+                image.save(input_file_name, format=image.format)
+        yield temp_name, input_file_name
     finally:
-        cleanup(f.name)
+        _remove_temp_dir(dirname)
 
 
 def subprocess_args(include_stdout=True):
@@ -230,6 +527,10 @@ def subprocess_args(include_stdout=True):
         'env': environ,
     }
 
+    thread_limit = omp_thread_limit()
+    if thread_limit and 'OMP_THREAD_LIMIT' not in environ:
+        kwargs['env'] = dict(environ, OMP_THREAD_LIMIT=str(thread_limit))
+
     if hasattr(subprocess, 'STARTUPINFO'):
         kwargs['startupinfo'] = subprocess.STARTUPINFO()
         kwargs['startupinfo'].dwFlags |= subprocess.STARTF_USESHOWWINDOW
@@ -243,14 +544,13 @@ def subprocess_args(include_stdout=True):
     return kwargs
 
 
-def run_tesseract(
+def build_cmd_args(
     input_filename,
     output_filename_base,
     extension,
     lang,
     config='',
     nice=0,
-    timeout=0,
 ):
     cmd_args = []
     not_windows = not (sys.platform == 'win32')
@@ -270,27 +570,132 @@ def run_tesseract(
         if _extension not in {'box', 'osd', 'tsv', 'xml'}:
             cmd_args.append(_extension)
     LOGGER.debug('%r', cmd_args)
+    return cmd_args
 
-    try:
-        proc = subprocess.Popen(cmd_args, **subprocess_args())
-    except OSError as e:
-        if e.errno != ENOENT:
-            raise
-        else:
-            raise TesseractNotFoundError()
 
-    with timeout_manager(proc, timeout) as error_string:
-        if proc.returncode:
-            raise TesseractError(proc.returncode, get_errors(error_string))
+def run_tesseract(
+    input_filename,
+    output_filename_base,
+    extension,
+    lang,
+    config='',
+    nice=0,
+    timeout=0,
+    input_data=None,
+    cancel=None,
+):
+    """
+    Runs Tesseract and returns whatever it wrote to stdout. input_data is
+    piped to its stdin, for use with input_filename='stdin'. Setting cancel,
+    a threading.Event, kills the process and raises RuntimeError.
+    """
+    cmd_args = build_cmd_args(
+        input_filename,
+        output_filename_base,
+        extension,
+        lang,
+        config,
+        nice,
+    )
+    describe(extension, lang, config, _input_size(input_filename, input_data))
+
+    with slot():
+        try:
+            with stage('spawn'):
+                proc = subprocess.Popen(cmd_args, **subprocess_args())
+        except OSError as e:
+            if e.errno != ENOENT:
+                raise
+            else:
+                raise TesseractNotFoundError()
+
+        with stage('wait'), timeout_manager(
+            proc,
+            timeout,
+            input_data,
+            cancel,
+        ) as (output, error_string):
+            if proc.returncode:
+                raise TesseractError(
+                    proc.returncode,
+                    get_errors(error_string),
+                )
+
+    add_bytes_out(len(output))
+    return output
+
+
+def _input_size(input_filename, input_data):
+    if input_data is not None:
+        return len(input_data)
+    try:
+        return getsize(input_filename)
+    except OSError:
+        return 0
 
 
 def _read_output(filename: str, return_bytes: bool = False):
-    with open(filename, 'rb') as output_file:
-        if return_bytes:
-            return output_file.read()
-        return output_file.read().decode(DEFAULT_ENCODING)
+    with stage('read'), open(filename, 'rb') as output_file:
+        output = output_file.read()
+    add_bytes_out(len(output))
+    return output if return_bytes else output.decode(DEFAULT_ENCODING)
+
+
+def _stream_input(image):
+    """Returns the (input_filename, input_data) pair to pipe the image."""
+    if isinstance(image, str):
+        return realpath(normpath(normcase(image))), None
+
+    if isinstance(image, Image.Image):
+        filename = source_filename(image)
+        if filename:
+            return filename, None
+
+    if _is_ndarray(image):
+        header = pnm_header(image)
+        if header:
+            return 'stdin', b''.join((header, _array_buffer(image)))
+
+    image, extension = prepare(image)
+    with BytesIO() as buffer:
+        image.save(buffer, format=image.format)
+        return 'stdin', buffer.getvalue()
+
+
+def _run_and_get_stdout(
+    image,
+    extension,
+    lang,
+    config,
+    nice,
+    timeout,
+    return_bytes,
+):
+    """Runs Tesseract with the image on stdin and the output on stdout."""
+    with stage('encode'):
+        input_filename, input_data = _stream_input(image)
+    output = run_tesseract(
+        input_filename,
+        'stdout',
+        extension,
+        lang,
+        config,
+        nice,
+        timeout,
+        input_data,
+    )
+    return output if return_bytes else output.decode(DEFAULT_ENCODING)
+
+
+def _use_stream(stream, extensions):
+    if stream is None:
+        stream = stream_mode
+    return (
+        stream and len(extensions) == 1 and extensions[0] in STDOUT_EXTENSIONS
+    )
 
 
+@timed
 def run_and_get_multiple_output(
     image,
     extensions: list[str],
@@ -298,14 +703,28 @@ def run_and_get_multiple_output(
     nice: int = 0,
     timeout: int = 0,
     return_bytes: bool = False,
+    stream: bool | None = None,
+    config: str = '',
 ):
-    config = ' '.join(
+    extension_config = ' '.join(
         EXTENTION_TO_CONFIG.get(extension, '') for extension in extensions
     ).strip()
-    if config:
-        config = f'-c {config}'
-    else:
-        config = ''
+    if extension_config:
+        config = f'-c {extension_config} {config.strip()}'.strip()
+
+    if _use_stream(stream, extensions):
+        (extension,) = extensions
+        return [
+            _run_and_get_stdout(
+                image,
+                extension,
+                lang,
+                config,
+                nice,
+                timeout,
+                True if extension in {'pdf', 'hocr'} else return_bytes,
+            ),
+        ]
 
     with save(image) as (temp_name, input_filename):
         kwargs = {
@@ -329,6 +748,7 @@ def run_and_get_multiple_output(
         ]
 
 
+@timed
 def run_and_get_output(
     image,
     extension='',
@@ -337,7 +757,73 @@ def run_and_get_output(
     nice=0,
     timeout=0,
     return_bytes=False,
+    stream=None,
 ):
+    cache = _active_cache
+    if cache is not None and extension in CACHEABLE_EXTENSIONS:
+        key = cache.make_key(image, extension, lang, config)
+        if key is not None:
+            output = cache.get(key)
+            if output is None:
+                output = _run_and_get_output(
+                    image,
+                    extension,
+                    lang,
+                    config,
+                    nice,
+                    timeout,
+                    True,
+                    stream,
+                )
+                cache.put(key, output)
+            return output if return_bytes else output.decode(DEFAULT_ENCODING)
+
+    return _run_and_get_output(
+        image,
+        extension,
+        lang,
+        config,
+        nice,
+        timeout,
+        return_bytes,
+        stream,
+    )
+
+
+def _run_and_get_output(
+    image,
+    extension,
+    lang,
+    config,
+    nice,
+    timeout,
+    return_bytes,
+    stream,
+):
+    pool = _active_pool
+    if pool is not None and not pool.owns_current_thread():
+        return pool.run(
+            image,
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+            return_bytes,
+            stream,
+        )
+
+    if _use_stream(stream, [extension]):
+        return _run_and_get_stdout(
+            image,
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+            return_bytes,
+        )
+
     with save(image) as (temp_name, input_filename):
         kwargs = {
             'input_filename': input_filename,
@@ -356,41 +842,306 @@ def run_and_get_output(
         )
 
 
-def file_to_dict(tsv, cell_delimiter, str_col_idx):
+def count_frames(image):
+    """
+    Returns the number of frames of an image file, or None if PIL can't open
+    it (e.g. an image list file).
+    """
+    try:
+        with Image.open(image) as img:
+            return getattr(img, 'n_frames', 1)
+    except (OSError, ValueError):
+        return None
+
+
+def count_pages(image):
+    """
+    Returns the number of pages Tesseract will see for the image in a
+    multi-image run, or None if it has to run on its own: image list files,
+    whose page count can't be known upfront, and multi-frame files, of which
+    an image list only reads the first frame.
+    """
+    if not isinstance(image, str):
+        # prepare() only saves the current frame of image objects
+        return 1
+    return 1 if count_frames(image) == 1 else None
+
+
+def _split_pages(output, extension, page_counts):
+    """
+    Splits the raw output of a multi-image run back into one output per
+    image, each holding page_counts[i] pages numbered as if run alone.
+    """
+    total = sum(page_counts)
+    offsets = [sum(page_counts[:i]) for i in range(len(page_counts))]
+
+    if extension == 'txt':
+        pages = output.split(PAGE_SEPARATOR)
+        if len(pages) == total + 1 and not pages[-1]:
+            # Tesseract < 5 terminates every page with the separator
+            pages = [page + PAGE_SEPARATOR for page in pages[:-1]]
+            joiner = b''
+        elif len(pages) == total:
+            joiner = PAGE_SEPARATOR
+        else:
+            raise ValueError('Unable to split text output into pages')
+
+        return [
+            joiner.join(pages[offset : offset + count])
+            for offset, count in zip(offsets, page_counts)
+        ]
+
+    if extension not in {'box', 'tsv'}:
+        raise ValueError(f'Unsupported batch extension: {extension}')
+
+    lines = output.split(b'\n')
+    ending = b'\n' if lines and not lines[-1] else b''
+    if ending:
+        lines.pop()
+
+    header = []
+    if extension == 'tsv':
+        header, lines = lines[:1], lines[1:]
+
+    grouped = [[] for _ in page_counts]
+    owner = [i for i, count in enumerate(page_counts) for _ in range(count)]
+    for line in lines:
+        if extension == 'tsv':
+            cells = line.split(b'\t')
+            page = int(cells[1]) - 1
+        else:
+            cells = line.rsplit(b' ', 1)
+            page = int(cells[-1])
+
+        if not 0 <= page < total:
+            raise ValueError(f'Unexpected page number in {extension} output')
+
+        index = owner[page]
+        if extension == 'tsv':
+            cells[1] = str(page - offsets[index] + 1).encode()
+            line = b'\t'.join(cells)
+        else:
+            cells[-1] = str(page - offsets[index]).encode()
+            line = b' '.join(cells)
+        grouped[index].append(line)
+
+    return [
+        b'\n'.join(header + rows) + ending if header or rows else b''
+        for rows in grouped
+    ]
+
+
+def _run_and_get_batch_output(
+    images,
+    page_counts,
+    extension,
+    lang=None,
+    config='',
+    nice=0,
+    timeout=0,
+):
+    """
+    Runs Tesseract once over all images through an image list file and
+    returns the raw output bytes of each image.
+    """
+    with ExitStack() as stack:
+        saved = [stack.enter_context(save(image)) for image in images]
+        temp_name = saved[0][0]
+        list_filename = f'{temp_name}_list{extsep}txt'
+        with open(list_filename, 'w', encoding=DEFAULT_ENCODING) as f:
+            f.write('\n'.join(input_filename for _, input_filename in saved))
+
+        run_tesseract(
+            list_filename,
+            temp_name,
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+        )
+        output = _read_output(f'{temp_name}{extsep}{extension}', True)
+
+    return _split_pages(output, extension, page_counts)
+
+
+@timed
+def run_and_get_batch_output(
+    images,
+    extension='',
+    lang=None,
+    config='',
+    nice=0,
+    timeout=0,
+    return_bytes=False,
+):
+    """
+    Returns one output per image like run_and_get_output, but from a single
+    Tesseract run over all the images. Image list files and multi-frame
+    files are run on their own (see count_pages).
+    """
+    if extension not in BATCH_EXTENSIONS:
+        raise ValueError(f'Unsupported batch extension: {extension}')
+
+    images = list(images)
+    page_counts = [count_pages(image) for image in images]
+    batched = [i for i, count in enumerate(page_counts) if count is not None]
+    outputs = [None] * len(images)
+
+    if batched:
+        batch_outputs = _run_and_get_batch_output(
+            [images[i] for i in batched],
+            [page_counts[i] for i in batched],
+            extension,
+            lang,
+            config,
+            nice,
+            timeout,
+        )
+        for i, output in zip(batched, batch_outputs):
+            outputs[i] = output
+
+    for i, output in enumerate(outputs):
+        if output is None:
+            outputs[i] = run_and_get_output(
+                images[i],
+                extension,
+                lang,
+                config,
+                nice,
+                timeout,
+                True,
+            )
+
+    if return_bytes:
+        return outputs
+    return [output.decode(DEFAULT_ENCODING) for output in outputs]
+
+
+def _to_int_column(values):
+    """Converts a whole column at once; ValueError if any cell isn't numeric"""
+    # numpy is faster, but not worth importing just for this
+    np = sys.modules.get('numpy')
+    if np is not None:
+        column = np.array(values, dtype=np.float64)
+        if column.size and not (
+            INT32_MIN <= column.min() and column.max() <= INT32_MAX
+        ):
+            # also catches nan, which int(float()) leaves as a string
+            raise OverflowError('Value out of int32 range')
+        return column.astype(np.int32)
+
+    try:
+        return array('i', map(int, values))
+    except ValueError:
+        return array('i', map(int, map(float, values)))
+
+
+def _to_mixed_column(values):
+    column = []
+    for value in values:
+        try:
+            column.append(int(float(value)))
+        except ValueError:
+            column.append(value)
+    return column
+
+
+def _ragged_file_to_columns(rows, header, str_col_idx):
+    result = {}
+    for i, head in enumerate(header):
+        values = [row[i] for row in rows if len(row) > i]
+        result[head] = (
+            values if i == str_col_idx else _to_mixed_column(values)
+        )
+    return result
+
+
+def file_to_columns(tsv, cell_delimiter, str_col_idx):
+    """
+    Parses the TSV/box output into {header: column}, where numeric columns
+    are int32 NumPy arrays (array('i') without NumPy) and the text column,
+    like any non numeric one, is a list
+    """
     result = {}
-    rows = [row.split(cell_delimiter) for row in tsv.strip().split('\n')]
-    if len(rows) < 2:
+    lines = tsv.strip().split('\n')
+    if len(lines) < 2:
         return result
 
-    header = rows.pop(0)
+    header = lines.pop(0).split(cell_delimiter)
     length = len(header)
-    if len(rows[-1]) < length:
+    if lines[-1].count(cell_delimiter) < length - 1:
         # Fixes bug that occurs when last text string in TSV is null, and
         # last row is missing a final cell in TSV file
-        rows[-1].append('')
+        lines[-1] += cell_delimiter
 
     if str_col_idx < 0:
         str_col_idx += length
 
+    delimiters = set(map(methodcaller('count', cell_delimiter), lines))
+    if delimiters != {length - 1}:
+        rows = [line.split(cell_delimiter) for line in lines]
+        return _ragged_file_to_columns(rows, header, str_col_idx)
+
+    # every row has the same width: split all cells at once and slice the
+    # columns out of the flat list instead of building a list per row
+    cells = cell_delimiter.join(lines).split(cell_delimiter)
     for i, head in enumerate(header):
-        result[head] = list()
-        for row in rows:
-            if len(row) <= i:
-                continue
-
-            if i != str_col_idx:
-                try:
-                    val = int(float(row[i]))
-                except ValueError:
-                    val = row[i]
-            else:
-                val = row[i]
+        values = cells[i::length]
+        if i == str_col_idx:
+            result[head] = values
+            continue
 
-            result[head].append(val)
+        try:
+            result[head] = _to_int_column(values)
+        except (ValueError, OverflowError):
+            result[head] = _to_mixed_column(values)
 
     return result
 
 
+@stage('parse')
+def file_to_dict(tsv, cell_delimiter, str_col_idx):
+    return {
+        head: column if isinstance(column, list) else column.tolist()
+        for head, column in file_to_columns(
+            tsv,
+            cell_delimiter,
+            str_col_idx,
+        ).items()
+    }
+
+
+@stage('parse')
+def file_to_ndarray(tsv, cell_delimiter, str_col_idx):
+    """
+    Returns the TSV/box output as a NumPy structured array with an int32
+    field per numeric column and a fixed width unicode text field
+    """
+    if not numpy_installed:
+        raise NumpyNotSupported()
+
+    import numpy as np
+
+    columns = file_to_columns(tsv, cell_delimiter, str_col_idx)
+    if not columns:
+        return np.empty(0, dtype=[])
+
+    dtype = []
+    for head, column in columns.items():
+        if isinstance(column, list):
+            width = max(map(len, map(str, column)), default=0)
+            dtype.append((head, f'U{width or 1}'))
+        else:
+            dtype.append((head, np.int32))
+
+    size = min(len(column) for column in columns.values())
+    result = np.empty(size, dtype=dtype)
+    for head, column in columns.items():
+        result[head] = column[:size]
+    return result
+
+
 def is_valid(val, _type):
     if _type is int:
         return val.isdigit()
@@ -405,6 +1156,7 @@ def is_valid(val, _type):
     return True
 
 
+@stage('parse')
 def osd_to_dict(osd):
     return {
         OSD_KEYS[kv[0]][0]: OSD_KEYS[kv[0]][1](kv[1])
@@ -470,6 +1222,7 @@ def get_tesseract_version():
     return version
 
 
+@timed
 def image_to_string(
     image,
     lang=None,
@@ -490,6 +1243,7 @@ def image_to_string(
     }[output_type]()
 
 
+@timed
 def image_to_pdf_or_hocr(
     image,
     lang=None,
@@ -497,6 +1251,7 @@ def image_to_pdf_or_hocr(
     nice=0,
     extension='pdf',
     timeout=0,
+    output_type=Output.BYTES,
 ):
     """
     Returns the result of a Tesseract OCR run on the provided image to pdf/hocr
@@ -505,20 +1260,28 @@ def image_to_pdf_or_hocr(
     if extension not in {'pdf', 'hocr'}:
         raise ValueError(f'Unsupported extension: {extension}')
 
+    if output_type == Output.WORDS and extension != 'hocr':
+        raise ValueError('Output.WORDS requires the hocr extension')
+
     if extension == 'hocr':
         config = f'-c tessedit_create_hocr=1 {config.strip()}'
 
     args = [image, extension, lang, config, nice, timeout, True]
 
-    return run_and_get_output(*args)
+    return {
+        Output.BYTES: lambda: run_and_get_output(*args),
+        Output.WORDS: lambda: parse_hocr(run_and_get_output(*args)),
+    }[output_type]()
 
 
+@timed
 def image_to_alto_xml(
     image,
     lang=None,
     config='',
     nice=0,
     timeout=0,
+    output_type=Output.BYTES,
 ):
     """
     Returns the result of a Tesseract OCR run on the provided image to ALTO XML
@@ -530,9 +1293,13 @@ def image_to_alto_xml(
     config = f'-c tessedit_create_alto=1 {config.strip()}'
     args = [image, 'xml', lang, config, nice, timeout, True]
 
-    return run_and_get_output(*args)
+    return {
+        Output.BYTES: lambda: run_and_get_output(*args),
+        Output.WORDS: lambda: parse_alto(run_and_get_output(*args)),
+    }[output_type]()
 
 
+@timed
 def image_to_boxes(
     image,
     lang=None,
@@ -560,7 +1327,8 @@ def image_to_boxes(
     }[output_type]()
 
 
-def get_pandas_output(args, config=None):
+@stage('parse')
+def tsv_to_dataframe(tsv, config=None):
     if not pandas_installed:
         raise PandasNotSupported()
 
@@ -570,9 +1338,19 @@ def get_pandas_output(args, config=None):
     except (TypeError, ValueError):
         pass
 
-    return pd.read_csv(BytesIO(run_and_get_output(*args)), **kwargs)
+    import pandas as pd
+
+    return pd.read_csv(BytesIO(tsv), **kwargs)
 
 
+def get_pandas_output(args, config=None):
+    if not pandas_installed:
+        raise PandasNotSupported()
+
+    return tsv_to_dataframe(run_and_get_output(*args), config)
+
+
+@timed
 def image_to_data(
     image,
     lang=None,
@@ -600,10 +1378,178 @@ def image_to_data(
             pandas_config,
         ),
         Output.DICT: lambda: file_to_dict(run_and_get_output(*args), '\t', -1),
+        Output.NUMPY: lambda: file_to_ndarray(
+            run_and_get_output(*args),
+            '\t',
+            -1,
+        ),
         Output.STRING: lambda: run_and_get_output(*args),
     }[output_type]()
 
 
+def iter_pages(image):
+    """
+    Yields every page (frame) of the image one at a time, so that only the
+    current page is held in memory. Single page inputs are yielded as is.
+    """
+    if isinstance(image, str):
+        try:
+            source = Image.open(image)
+        except (OSError, ValueError):
+            # e.g. image list files, left to Tesseract
+            yield image
+            return
+
+        with source:
+            if not getattr(source, 'is_animated', False):
+                yield image
+                return
+            yield from _iter_frames(source)
+        return
+
+    if getattr(image, 'is_animated', False):
+        current = image.tell()
+        try:
+            yield from _iter_frames(image)
+        finally:
+            image.seek(current)
+        return
+
+    yield image
+
+
+def _iter_frames(image):
+    for index in range(image.n_frames):
+        image.seek(index)
+        yield image.copy()
+
+
+def _set_page_num(tsv, page_num):
+    lines = tsv.split(b'\n')
+    page_num = str(page_num).encode()
+    for i, line in enumerate(lines[1:], 1):
+        cells = line.split(b'\t')
+        if len(cells) > 1:
+            cells[1] = page_num
+            lines[i] = b'\t'.join(cells)
+    return b'\n'.join(lines)
+
+
+def iter_image_to_string(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+):
+    """
+    Yields the image_to_string result of every page of a multi-page image
+    as soon as the page is recognized (the timeout applies per page)
+    """
+    for page in iter_pages(image):
+        yield image_to_string(page, lang, config, nice, output_type, timeout)
+
+
+def iter_image_to_data(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+    pandas_config=None,
+):
+    """
+    Yields the image_to_data result of every page of a multi-page image
+    as soon as the page is recognized, with page_num set to the page number
+    """
+    for page_num, page in enumerate(iter_pages(image), 1):
+        tsv = image_to_data(page, lang, config, nice, Output.BYTES, timeout)
+        # inputs left whole (e.g. image list files) keep Tesseract's numbers
+        if page is not image:
+            tsv = _set_page_num(tsv, page_num)
+        yield {
+            Output.BYTES: lambda: tsv,
+            Output.DATAFRAME: lambda: tsv_to_dataframe(tsv, pandas_config),
+            Output.DICT: lambda: file_to_dict(
+                tsv.decode(DEFAULT_ENCODING),
+                '\t',
+                -1,
+            ),
+            Output.NUMPY: lambda: file_to_ndarray(
+                tsv.decode(DEFAULT_ENCODING),
+                '\t',
+                -1,
+            ),
+            Output.STRING: lambda: tsv.decode(DEFAULT_ENCODING),
+        }[output_type]()
+
+
+@timed
+def image_to_string_batch(
+    images,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+):
+    """
+    Returns a list with the image_to_string result of every image, from a
+    single Tesseract run (the timeout applies to the whole run)
+    """
+    args = [images, 'txt', lang, config, nice, timeout]
+
+    return {
+        Output.BYTES: lambda: run_and_get_batch_output(*(args + [True])),
+        Output.DICT: lambda: [
+            {'text': text} for text in run_and_get_batch_output(*args)
+        ],
+        Output.STRING: lambda: run_and_get_batch_output(*args),
+    }[output_type]()
+
+
+@timed
+def image_to_data_batch(
+    images,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+    pandas_config=None,
+):
+    """
+    Returns a list with the image_to_data result of every image, from a
+    single Tesseract run. page_num restarts at 1 for every image.
+    """
+
+    if get_tesseract_version(cached=True) < TESSERACT_MIN_VERSION:
+        raise TSVNotSupported()
+
+    config = f'-c tessedit_create_tsv=1 {config.strip()}'
+    args = [images, 'tsv', lang, config, nice, timeout]
+
+    return {
+        Output.BYTES: lambda: run_and_get_batch_output(*(args + [True])),
+        Output.DATAFRAME: lambda: [
+            tsv_to_dataframe(tsv, pandas_config)
+            for tsv in run_and_get_batch_output(*(args + [True]))
+        ],
+        Output.DICT: lambda: [
+            file_to_dict(tsv, '\t', -1)
+            for tsv in run_and_get_batch_output(*args)
+        ],
+        Output.NUMPY: lambda: [
+            file_to_ndarray(tsv, '\t', -1)
+            for tsv in run_and_get_batch_output(*args)
+        ],
+        Output.STRING: lambda: run_and_get_batch_output(*args),
+    }[output_type]()
+
+
+@timed
 def image_to_osd(
     image,
     lang='osd',
@@ -626,12 +1572,22 @@ def image_to_osd(
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        from .batch import batch_main
+
+        return batch_main(sys.argv[2:])
+
     if len(sys.argv) == 2:
         filename, lang = sys.argv[1], None
     elif len(sys.argv) == 4 and sys.argv[1] == '-l':
         filename, lang = sys.argv[3], sys.argv[2]
     else:
-        print('Usage: pytesseract [-l lang] input_file\n', file=sys.stderr)
+        print(
+            'Usage: pytesseract [-l lang] input_file\n'
+            '       pytesseract --batch [-l lang] [-j jobs] '
+            '[--manifest file] input ...\n',
+            file=sys.stderr,
+        )
         return 2
 
     try:
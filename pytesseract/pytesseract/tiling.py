@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from os import cpu_count
+
+from PIL import Image
+
+from .pytesseract import _is_ndarray
+from .pytesseract import DEFAULT_ENCODING
+from .pytesseract import file_to_dict
+from .pytesseract import file_to_ndarray
+from .pytesseract import image_to_data
+from .pytesseract import Output
+from .pytesseract import tsv_to_dataframe
+from .timing import timed
+
+# bands thinner than this aren't worth a Tesseract process of their own
+MIN_BAND_HEIGHT = 1000
+
+TSV_HEADER = (
+    'level',
+    'page_num',
+    'block_num',
+    'par_num',
+    'line_num',
+    'word_num',
+    'left',
+    'top',
+    'width',
+    'height',
+    'conf',
+    'text',
+)
+LEVEL, _, BLOCK, PAR, LINE, _, LEFT, TOP, WIDTH, HEIGHT, CONF, TEXT = range(12)
+PAGE_LEVEL, WORD_LEVEL = '1', '5'
+
+
+def split_bands(height, bands, overlap):
+    """
+    Returns the (top, bottom, core_top, core_bottom) of every band: the band
+    is cropped from top to bottom, and owns the words centered in its core
+    """
+    cuts = [height * i // bands for i in range(bands + 1)]
+    return [
+        (
+            max(0, core_top - overlap),
+            min(height, core_bottom + overlap),
+            core_top,
+            core_bottom,
+        )
+        for core_top, core_bottom in zip(cuts, cuts[1:])
+    ]
+
+
+def _center(row):
+    return int(row[TOP]) + int(row[HEIGHT]) / 2
+
+
+def _keep_rows(rows, offset, core_top, core_bottom):
+    """
+    Returns the rows of a band that belong to it: the words centered in its
+    core, and the block/paragraph/line rows containing them or, for those
+    without any word, centered in its core
+    """
+
+    def in_core(row):
+        return core_top <= _center(row) + offset < core_bottom
+
+    def keys(row):
+        block, par, line = row[BLOCK], row[PAR], row[LINE]
+        return (block,), (block, par), (block, par, line)
+
+    with_words = set()
+    kept_words = set()
+    for row in rows:
+        if row[LEVEL] == WORD_LEVEL:
+            with_words.update(keys(row))
+            if in_core(row):
+                kept_words.update(keys(row))
+
+    kept = []
+    for row in rows:
+        level = row[LEVEL]
+        if level == PAGE_LEVEL:
+            continue
+        if level == WORD_LEVEL:
+            if in_core(row):
+                kept.append(row)
+            continue
+
+        key = keys(row)[int(level) - 2]
+        if key in kept_words or (key not in with_words and in_core(row)):
+            kept.append(row)
+    return kept
+
+
+def merge_bands(tsvs, bands, size):
+    """Merges the TSV outputs of the bands into one TSV of the whole page."""
+    width, height = size
+    lines = [
+        '\t'.join(TSV_HEADER),
+        f'{PAGE_LEVEL}\t1\t0\t0\t0\t0\t0\t0\t{width}\t{height}\t-1\t',
+    ]
+    block_offset = 0
+    for tsv, (top, _, core_top, core_bottom) in zip(tsvs, bands):
+        rows = [
+            line.split('\t')
+            for line in tsv.decode(DEFAULT_ENCODING).splitlines()[1:]
+            if line
+        ]
+        rows = [row for row in rows if len(row) == len(TSV_HEADER)]
+
+        last_block = 0
+        for row in _keep_rows(rows, top, core_top, core_bottom):
+            block = int(row[BLOCK])
+            last_block = max(last_block, block)
+            row[BLOCK] = str(block + block_offset)
+            row[TOP] = str(int(row[TOP]) + top)
+            lines.append('\t'.join(row))
+        block_offset += last_block
+
+    return '\n'.join(lines).encode(DEFAULT_ENCODING) + b'\n'
+
+
+def _load(image):
+    if isinstance(image, str):
+        with Image.open(image) as opened:
+            opened.load()
+            return opened
+    if _is_ndarray(image):
+        return Image.fromarray(image)
+    if not isinstance(image, Image.Image):
+        raise TypeError('Unsupported image object')
+    # crop() loads the image, which isn't thread safe
+    image.load()
+    return image
+
+
+def _size(image):
+    if isinstance(image, str):
+        with Image.open(image) as opened:
+            return opened.size
+    if _is_ndarray(image):
+        height, width = image.shape[:2]
+        return width, height
+    return image.size
+
+
+@timed
+def image_to_data_tiled(
+    image,
+    lang=None,
+    config='',
+    nice=0,
+    output_type=Output.STRING,
+    timeout=0,
+    pandas_config=None,
+    bands=None,
+    overlap=None,
+):
+    """
+    Returns the same result as image_to_data, from overlapping horizontal
+    bands of the image recognized concurrently. Coordinates are translated
+    back to the page and words recognized twice in the overlaps are dropped.
+
+    bands defaults to the number of CPUs, as long as every band is at least
+    MIN_BAND_HEIGHT pixels high. overlap is the number of pixels a band
+    extends into its neighbours, a 40th of the height by default; it must
+    be larger than the text lines. The timeout applies to every band.
+    """
+    width, height = _size(image)
+    if bands is None:
+        bands = min(cpu_count() or 1, height // MIN_BAND_HEIGHT)
+    bands = max(1, min(bands, height))
+    if overlap is None:
+        overlap = max(32, height // 40)
+
+    def run(image):
+        return image_to_data(image, lang, config, nice, Output.BYTES, timeout)
+
+    if bands == 1:
+        tsv = run(image)
+    else:
+        image = _load(image)
+        boxes = split_bands(height, bands, overlap)
+        with ThreadPoolExecutor(bands) as executor:
+            futures = [
+                executor.submit(
+                    copy_context().run,
+                    run,
+                    image.crop((0, top, width, bottom)),
+                )
+                for top, bottom, _, _ in boxes
+            ]
+            tsvs = [future.result() for future in futures]
+        tsv = merge_bands(tsvs, boxes, (width, height))
+
+    return {
+        Output.BYTES: lambda: tsv,
+        Output.DATAFRAME: lambda: tsv_to_dataframe(tsv, pandas_config),
+        Output.DICT: lambda: file_to_dict(
+            tsv.decode(DEFAULT_ENCODING),
+            '\t',
+            -1,
+        ),
+        Output.NUMPY: lambda: file_to_ndarray(
+            tsv.decode(DEFAULT_ENCODING),
+            '\t',
+            -1,
+        ),
+        Output.STRING: lambda: tsv.decode(DEFAULT_ENCODING),
+    }[output_type]()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""
+Per-call timing records and cumulative timing statistics.
+
+Every top level pytesseract call (image_to_string, run_and_get_output, ...)
+produces one TimingRecord with the time spent in each stage:
+
+* encode: writing or encoding the image for Tesseract
+* queue: waiting for a free process slot (see set_max_processes())
+* spawn: starting the Tesseract process
+* wait: model loading and recognition, until Tesseract exits
+* read: reading the output files
+* parse: converting the output to dicts, arrays or data frames
+
+Records are passed to the callbacks registered with add_timing_hook() or
+timing_hook(), and accumulated into counters and histograms that
+get_timing_stats() returns.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from time import perf_counter
+
+STAGES = ('encode', 'queue', 'spawn', 'wait', 'read', 'parse')
+# upper bounds, in seconds, of the histogram buckets (plus one for the rest)
+HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+LOGGER = logging.getLogger('pytesseract')
+
+_current = ContextVar('pytesseract_timing_record', default=None)
+_hooks = []
+
+
+class TimingRecord:
+    """Timings and sizes of a single pytesseract call."""
+
+    __slots__ = (
+        'function',
+        'extension',
+        'lang',
+        'config',
+        'bytes_in',
+        'bytes_out',
+        'stages',
+        'total',
+        'error',
+    )
+
+    def __init__(self, function):
+        self.function = function
+        self.extension = None
+        self.lang = None
+        self.config = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.total = 0.0
+        self.error = None
+
+    def __repr__(self):
+        return f'TimingRecord({self.as_dict()!r})'
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Histogram:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'histogram': list(
+                zip(HISTOGRAM_BOUNDS + (float('inf'),), self.buckets),
+            ),
+        }
+
+
+class _TimingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.histograms = {
+                name: _Histogram() for name in STAGES + ('total',)
+            }
+
+    def add_record(self, record):
+        with self._lock:
+            self.calls += 1
+            self.errors += record.error is not None
+            self.bytes_in += record.bytes_in
+            self.bytes_out += record.bytes_out
+            for name, seconds in record.stages.items():
+                if seconds:
+                    self.histograms[name].add(seconds)
+            self.histograms['total'].add(record.total)
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.histograms[name].add(seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'stages': {
+                    name: histogram.as_dict()
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+
+_stats = _TimingStats()
+
+
+def add_timing_hook(callback):
+    """Calls callback(record) with the TimingRecord of every call."""
+    _hooks.append(callback)
+
+
+def remove_timing_hook(callback):
+    try:
+        _hooks.remove(callback)
+    except ValueError:
+        pass
+
+
+@contextmanager
+def timing_hook(callback):
+    add_timing_hook(callback)
+    try:
+        yield callback
+    finally:
+        remove_timing_hook(callback)
+
+
+def get_timing_stats():
+    """
+    Returns the number of calls, errors and bytes in/out, and the count,
+    total, max and histogram of the seconds spent in each stage
+    """
+    return _stats.as_dict()
+
+
+def reset_timing_stats():
+    _stats.reset()
+
+
+def current_record():
+    return _current.get()
+
+
+def describe(extension, lang, config, bytes_in=0):
+    """Fills in the call details of the current record, if any."""
+    record = _current.get()
+    if record is not None:
+        record.extension = extension
+        record.lang = lang
+        record.config = config
+        record.bytes_in += bytes_in
+
+
+def add_bytes_out(size):
+    record = _current.get()
+    if record is not None:
+        record.bytes_out += size
+
+
+@contextmanager
+def stage(name):
+    """Adds the time spent in the block to the stage of the current call."""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        seconds = perf_counter() - start
+        record = _current.get()
+        if record is None:
+            _stats.add_stage(name, seconds)
+        else:
+            record.stages[name] += seconds
+
+
+@contextmanager
+def _record(function):
+    record = TimingRecord(function)
+    token = _current.set(record)
+    start = perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.total = perf_counter() - start
+        _current.reset(token)
+        _stats.add_record(record)
+        for callback in list(_hooks):
+            try:
+                callback(record)
+            except Exception:
+                LOGGER.exception('Timing hook %r failed', callback)
+
+
+def timed(func):
+    """
+    Makes func a top level call: it gets its own TimingRecord unless it
+    runs as part of another timed call
+    """
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _current.get() is not None:
+                return await func(*args, **kwargs)
+            with _record(func.__name__):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is not None:
+            return func(*args, **kwargs)
+        with _record(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from glob import iglob
 from multiprocessing import Pool
+from os import cpu_count
 from os import getcwd
 from os import path
 from os import sep
+from os import walk
+from sys import executable
 from sys import platform
 from sys import version_info
 from tempfile import gettempdir
@@ -13,24 +19,54 @@ from unittest import mock
 
 import pytest
 
+from pytesseract import aimage_to_data
+from pytesseract import aimage_to_string
 from pytesseract import ALTONotSupported
+from pytesseract import auto_rotate
+from pytesseract import get_admission_stats
 from pytesseract import get_languages
 from pytesseract import get_tesseract_version
+from pytesseract import get_timing_stats
 from pytesseract import image_to_alto_xml
 from pytesseract import image_to_boxes
 from pytesseract import image_to_data
+from pytesseract import image_to_data_batch
+from pytesseract import image_to_data_tiled
 from pytesseract import image_to_osd
 from pytesseract import image_to_pdf_or_hocr
 from pytesseract import image_to_string
+from pytesseract import image_to_string_batch
+from pytesseract import iter_image_to_data
+from pytesseract import iter_image_to_string
+from pytesseract import ocr_best_of
+from pytesseract import OCRCache
 from pytesseract import Output
+from pytesseract import reset_timing_stats
 from pytesseract import run_and_get_multiple_output
+from pytesseract import run_and_get_output
+from pytesseract import set_max_processes
 from pytesseract import TesseractNotFoundError
+from pytesseract import TesseractPool
+from pytesseract import TesseractQueueTimeout
+from pytesseract import timing_hook
 from pytesseract import TSVNotSupported
+from pytesseract.best_of import BestOf
+from pytesseract.cache import hash_image
+from pytesseract.layout import parse_alto
+from pytesseract.layout import parse_hocr
+from pytesseract.pool import _Worker
+from pytesseract.pytesseract import _split_pages
 from pytesseract.pytesseract import file_to_dict
+from pytesseract.pytesseract import file_to_ndarray
 from pytesseract.pytesseract import LANG_PATTERN
 from pytesseract.pytesseract import numpy_installed
 from pytesseract.pytesseract import pandas_installed
 from pytesseract.pytesseract import prepare
+from pytesseract.pytesseract import RAM_TEMP_DIR
+from pytesseract.pytesseract import save
+from pytesseract.pytesseract import subprocess_args
+from pytesseract.tiling import merge_bands
+from pytesseract.tiling import split_bands
 
 if numpy_installed:
     import numpy as np
@@ -133,8 +169,9 @@ def test_image_to_string_with_args_type(test_file):
     assert 'The quick brown dog' in image_to_string(test_file, 'eng')
 
     # Test cleanup of temporary files
-    for _ in iglob(gettempdir() + sep + 'tess_*'):
-        assert False, 'Failed to cleanup temporary files'
+    for temp_dir in (gettempdir(), RAM_TEMP_DIR):
+        for _ in iglob(temp_dir + sep + 'tess_*'):
+            assert False, 'Failed to cleanup temporary files'
 
 
 @pytest.mark.skipif(numpy_installed is False, reason='requires numpy')
@@ -145,6 +182,54 @@ def test_image_to_string_with_numpy_array(test_file):
     )
 
 
+def test_save_reuses_source_file(test_file):
+    image = Image.open(test_file)
+    with save(image) as (_, input_filename):
+        assert input_filename == path.realpath(test_file)
+
+    image.load()
+    image.putpixel((0, 0), (0, 0, 0))
+    with save(image) as (_, input_filename):
+        assert input_filename != path.realpath(test_file)
+
+
+def test_save_temp_dir(monkeypatch, tmpdir, test_file):
+    monkeypatch.setattr('pytesseract.pytesseract.temp_dir', None)
+    monkeypatch.setattr('pytesseract.pytesseract.RAM_TEMP_DIR', str(tmpdir))
+    image = Image.open(test_file).convert('L')
+    with save(image) as (temp_name, input_filename):
+        assert path.dirname(path.dirname(input_filename)) == str(tmpdir)
+        # outputs written next to temp_name are removed along with it
+        with open(f'{temp_name}.txt', 'w'):
+            pass
+    assert not tmpdir.listdir()
+
+    # too large for the RAM-backed directory
+    monkeypatch.setattr('pytesseract.pytesseract.ram_temp_max_bytes', 1)
+    with save(image) as (_, input_filename):
+        assert path.dirname(path.dirname(input_filename)) == gettempdir()
+
+    monkeypatch.setattr('pytesseract.pytesseract.temp_dir', str(tmpdir))
+    with save(image) as (_, input_filename):
+        assert path.dirname(path.dirname(input_filename)) == str(tmpdir)
+    assert not tmpdir.listdir()
+
+
+@pytest.mark.skipif(numpy_installed is False, reason='requires numpy')
+@pytest.mark.parametrize(
+    ('mode', 'expected_extension'),
+    [('RGB', 'ppm'), ('L', 'pgm')],
+    ids=['rgb', 'grayscale'],
+)
+def test_save_numpy_array_as_pnm(test_file, mode, expected_extension):
+    array = np.array(Image.open(test_file).convert(mode))
+    with save(array) as (_, input_filename):
+        assert input_filename.endswith(expected_extension)
+        with Image.open(input_filename) as saved:
+            assert saved.mode == mode
+            assert np.array_equal(np.array(saved), array)
+
+
 @pytest.mark.lang_fra
 def test_image_to_string_european(test_file_european):
     assert 'La volpe marrone' in image_to_string(test_file_european, 'fra')
@@ -159,6 +244,139 @@ def test_image_to_string_batch():
     assert 'The quick brown dog' in image_to_string(batch_file)
 
 
+def test_image_to_string_batch_list():
+    test_files = [
+        path.join(DATA_DIR, test_file)
+        for test_file in ['test.jpg', 'test.pgm', 'test.tiff']
+    ]
+    test_files.append(Image.open(TEST_JPEG))
+    test_files.append(path.join(DATA_DIR, 'images.txt'))
+    results = image_to_string_batch(test_files, 'eng')
+    assert len(results) == len(test_files)
+    for test_file, result in zip(test_files, results):
+        assert result == image_to_string(test_file, 'eng')
+
+
+@pytest.mark.skipif(
+    TESSERACT_VERSION[:2] < (3, 5),
+    reason='requires tesseract >= 3.05',
+)
+def test_image_to_data_batch(test_file_small, test_file):
+    results = image_to_data_batch(
+        [test_file_small, test_file],
+        output_type=Output.DICT,
+    )
+    for test_file, result in zip([test_file_small, test_file], results):
+        expected = image_to_data(test_file, output_type=Output.DICT)
+        assert set(result['page_num']) == {1}
+        assert result['text'] == expected['text']
+        assert result['left'] == expected['left']
+
+
+@pytest.fixture
+def multi_page_tiff(tmp_path, test_file_small, test_file):
+    filename = str(tmp_path / 'multi.tiff')
+    first, second = Image.open(test_file_small), Image.open(test_file)
+    first.save(filename, save_all=True, append_images=[second])
+    return filename
+
+
+def test_image_to_data_batch_multi_page(multi_page_tiff, test_file):
+    # image lists only read the first frame: multi-page files run alone
+    images = [multi_page_tiff, test_file]
+    results = image_to_data_batch(images, output_type=Output.DICT)
+    for image, result in zip(images, results):
+        assert result == image_to_data(image, output_type=Output.DICT)
+    assert set(results[0]['page_num']) == {1, 2}
+
+    results = image_to_string_batch(images)
+    assert results == [image_to_string(image) for image in images]
+
+
+def test_iter_image_to_string(multi_page_tiff, test_file_small, test_file):
+    results = iter_image_to_string(multi_page_tiff, 'eng')
+    assert next(results) == image_to_string(test_file_small, 'eng')
+    assert next(results) == image_to_string(test_file, 'eng')
+    assert next(results, None) is None
+
+    image = Image.open(multi_page_tiff)
+    image.seek(1)
+    assert len(list(iter_image_to_string(image))) == 2
+    assert image.tell() == 1
+
+
+@pytest.mark.skipif(
+    TESSERACT_VERSION[:2] < (3, 5),
+    reason='requires tesseract >= 3.05',
+)
+def test_iter_image_to_data(multi_page_tiff, test_file):
+    results = list(
+        iter_image_to_data(multi_page_tiff, output_type=Output.DICT),
+    )
+    assert len(results) == 2
+    for page_num, result in enumerate(results, 1):
+        assert set(result['page_num']) == {page_num}
+
+    expected = image_to_data(test_file, output_type=Output.DICT)
+    assert results[1]['text'] == expected['text']
+
+
+def test_iter_image_to_data_image_list(tmpdir, test_file):
+    image_list = tmpdir.join('images.txt')
+    image_list.write(f'{test_file}\n' * 2)
+    (result,) = iter_image_to_data(str(image_list), output_type=Output.DICT)
+    assert set(result['page_num']) == {1, 2}
+
+
+@pytest.mark.skipif(
+    TESSERACT_VERSION[:2] < (3, 5),
+    reason='requires tesseract >= 3.05',
+)
+def test_image_to_data_tiled(test_file):
+    image = Image.open(test_file)
+    expected = image_to_data(image, output_type=Output.DICT)
+    assert image_to_data_tiled(image, output_type=Output.DICT) == expected
+
+    result = image_to_data_tiled(image, bands=2, output_type=Output.DICT)
+    assert result.keys() == expected.keys()
+    assert (result['width'][0], result['height'][0]) == image.size
+    assert max(result['top']) < image.height
+
+
+def test_merge_bands():
+    header = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\t'
+    header += 'left\ttop\twidth\theight\tconf\ttext\n'
+    tsvs = [
+        header
+        + '1\t1\t0\t0\t0\t0\t0\t0\t100\t120\t-1\t\n'
+        + '2\t1\t1\t0\t0\t0\t0\t10\t90\t95\t-1\t\n'
+        + '4\t1\t1\t1\t1\t0\t0\t10\t90\t10\t-1\t\n'
+        + '5\t1\t1\t1\t1\t1\t0\t10\t30\t10\t95\ttop\n'
+        + '4\t1\t1\t1\t2\t0\t0\t95\t90\t10\t-1\t\n'
+        + '5\t1\t1\t1\t2\t1\t0\t95\t30\t10\t90\tmid\n',
+        header
+        + '1\t1\t0\t0\t0\t0\t0\t0\t100\t120\t-1\t\n'
+        + '2\t1\t1\t0\t0\t0\t0\t15\t90\t95\t-1\t\n'
+        + '4\t1\t1\t1\t1\t0\t0\t15\t90\t10\t-1\t\n'
+        + '5\t1\t1\t1\t1\t1\t0\t15\t30\t10\t92\tmid\n'
+        + '5\t1\t1\t1\t1\t2\t0\t100\t30\t10\t96\tbottom\n',
+    ]
+    bands = split_bands(200, 2, 20)
+    assert bands == [(0, 120, 0, 100), (80, 200, 100, 200)]
+
+    result = file_to_dict(
+        merge_bands([tsv.encode() for tsv in tsvs], bands, (100, 200))
+        .decode()
+        .strip(),
+        '\t',
+        -1,
+    )
+    assert result['text'] == ['', '', '', 'top', '', '', 'mid', 'bottom']
+    assert result['block_num'] == [0, 1, 1, 1, 2, 2, 2, 2]
+    assert result['top'] == [0, 10, 10, 10, 95, 95, 95, 180]
+    assert result['height'][0] == 200
+
+
 def test_image_to_string_multiprocessing():
     """Test parallel system calls."""
     test_files = [
@@ -178,11 +396,338 @@ def test_image_to_string_multiprocessing():
     p.join()
 
 
+def test_image_to_string_pool(test_file):
+    """Test concurrent calls coalesced by the worker pool."""
+    test_files = [
+        path.join(DATA_DIR, test_file)
+        for test_file in ['test.jpg', 'test.pgm', 'test.png', 'test.ppm']
+    ]
+    expected = [image_to_string(test_file, 'eng') for test_file in test_files]
+
+    with TesseractPool(size=1) as pool:
+        futures = [pool.submit(f, 'txt', 'eng') for f in test_files]
+        assert [future.result() for future in futures] == expected
+        assert image_to_string(test_files[0], 'eng') == expected[0]
+        assert pool.stats()['healthy']
+
+
+def test_image_to_string_pool_timeout(test_file):
+    with TesseractPool(size=1):
+        with pytest.raises(RuntimeError):
+            image_to_string(test_file, timeout=0.000000001)
+
+
+def test_pool_timeout_not_coalesced(test_file):
+    pool = TesseractPool(size=1)
+    # queue jobs without starting the workers
+    pool._closed = False
+    for timeout in (0, 0, 5, 5):
+        pool.submit(test_file, 'txt', 'eng', timeout=timeout)
+    worker = _Worker()
+    assert [len(pool._take_batch(worker)) for _ in range(3)] == [2, 1, 1]
+
+
+def test_pool_multi_page_not_coalesced(multi_page_tiff, test_file):
+    pool = TesseractPool(size=1)
+    pool._closed = False
+    for image in (test_file, multi_page_tiff, test_file, multi_page_tiff):
+        pool.submit(image, 'txt', 'eng')
+    worker = _Worker()
+    batches = [pool._take_batch(worker) for _ in range(3)]
+    assert [[job.image for job in batch] for batch in batches] == [
+        [test_file, test_file],
+        [multi_page_tiff],
+        [multi_page_tiff],
+    ]
+
+
+@pytest.mark.parametrize(
+    ('output', 'extension', 'page_counts', 'expected'),
+    (
+        (b'a\fb\fc', 'txt', [1, 2], [b'a', b'b\fc']),
+        (b'a\fb\f', 'txt', [1, 1], [b'a\f', b'b\f']),
+        (
+            b'level\tpage_num\n1\t1\n1\t2\n5\t2\n',
+            'tsv',
+            [1, 1],
+            [b'level\tpage_num\n1\t1\n', b'level\tpage_num\n1\t1\n5\t1\n'],
+        ),
+        (b'T 1 2 3 4 0\nh 1 2 3 4 1\n', 'box', [1, 1, 1], [
+            b'T 1 2 3 4 0\n',
+            b'h 1 2 3 4 0\n',
+            b'',
+        ]),
+    ),
+    ids=['txt', 'txt_trailing_separator', 'tsv', 'box'],
+)
+def test_split_pages(output, extension, page_counts, expected):
+    assert _split_pages(output, extension, page_counts) == expected
+
+
+@pytest.mark.parametrize(
+    'test_file',
+    [TEST_JPEG, Image.open(TEST_JPEG)],
+    ids=['path_str', 'image_object'],
+)
+def test_run_and_get_output_stream(monkeypatch, test_file):
+    """Test the stdin/stdout mode doesn't touch the temp directory."""
+    import pytesseract
+
+    expected = run_and_get_output(test_file, 'txt', 'eng')
+    monkeypatch.setattr(
+        'pytesseract.pytesseract.save',
+        mock.Mock(side_effect=AssertionError('temp file used')),
+    )
+    assert run_and_get_output(test_file, 'txt', 'eng', stream=True) == expected
+    assert run_and_get_multiple_output(
+        test_file,
+        extensions=['txt'],
+        lang='eng',
+        stream=True,
+    ) == [expected]
+
+    monkeypatch.setattr('pytesseract.pytesseract.stream_mode', True)
+    assert pytesseract.image_to_string(test_file, 'eng') == expected
+
+
+def test_run_and_get_multiple_output_stream_fallback(test_file):
+    assert run_and_get_multiple_output(
+        test_file,
+        extensions=['txt', 'tsv'],
+        stream=True,
+    ) == run_and_get_multiple_output(test_file, extensions=['txt', 'tsv'])
+
+
+@pytest.mark.parametrize(
+    'test_file',
+    [TEST_JPEG, Image.open(TEST_JPEG)],
+    ids=['path_str', 'image_object'],
+)
+def test_image_to_string_cache(tmpdir, test_file):
+    expected = image_to_string(test_file, 'eng')
+
+    with OCRCache(directory=str(tmpdir)) as cache:
+        assert image_to_string(test_file, 'eng') == expected
+        with mock.patch('pytesseract.pytesseract.run_tesseract') as run_mock:
+            assert image_to_string(test_file, 'eng') == expected
+            result = image_to_string(
+                test_file,
+                'eng',
+                output_type=Output.BYTES,
+            )
+            assert result == expected.encode()
+            run_mock.assert_not_called()
+        image_to_string(test_file, 'eng', config='--psm 6')
+        assert cache.stats()['hits'] == 2
+        assert cache.stats()['misses'] == 2
+
+    with OCRCache(directory=str(tmpdir)) as disk_cache:
+        with mock.patch('pytesseract.pytesseract.run_tesseract') as run_mock:
+            assert image_to_string(test_file, 'eng') == expected
+            run_mock.assert_not_called()
+        assert disk_cache.stats()['disk_hits'] == 1
+
+
+def test_cache_disk_write_error(tmpdir):
+    cache = OCRCache(directory=str(tmpdir))
+    with mock.patch('os.replace', side_effect=OSError('disk full')):
+        cache.put('a' * 64, b'123')
+    assert cache.get('a' * 64) == b'123'
+    assert not list(cache._disk_entries())
+    assert not [name for _, _, names in walk(str(tmpdir)) for name in names]
+
+
+def test_hash_image_leaves_image_untouched(test_file):
+    image = Image.open(test_file).convert('RGBA')
+    assert image.format is None
+    digest = hash_image(image)
+    assert image.format is None
+    assert hash_image(image.copy()) == digest
+    assert hash_image(image.convert('RGB')) != digest
+
+
+def test_cache_lru_eviction(tmpdir):
+    cache = OCRCache(max_entries=2, directory=str(tmpdir), max_disk_bytes=5)
+    cache.put('a' * 64, b'123')
+    cache.put('b' * 64, b'456')
+    assert cache.get('a' * 64) == b'123'
+    cache.put('c' * 64, b'789')
+    assert set(cache._entries) == {'a' * 64, 'c' * 64}
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['disk_evictions'] == 2
+
+    cache.clear()
+    assert cache.get('b' * 64) is None
+    assert cache.get('c' * 64) == b'789'
+    assert cache.stats()['disk_hits'] == 1
+
+
+@pytest.mark.skipif(
+    TESSERACT_VERSION[:2] < (3, 5),
+    reason='requires tesseract >= 3.05',
+)
+@pytest.mark.parametrize('stream', [False, True], ids=['file', 'stream'])
+def test_timing_hook(monkeypatch, test_file, stream):
+    monkeypatch.setattr('pytesseract.pytesseract.stream_mode', stream)
+    records = []
+    with timing_hook(records.append):
+        image_to_data(Image.open(test_file), 'eng', output_type=Output.DICT)
+    image_to_string(test_file)
+
+    (record,) = records
+    assert record.function == 'image_to_data'
+    assert (record.extension, record.lang) == ('tsv', 'eng')
+    assert record.error is None
+    assert record.bytes_in > 0 and record.bytes_out > 0
+    assert all(record.stages[name] > 0 for name in ['spawn', 'wait', 'parse'])
+    assert record.stages['read'] > 0 or stream
+    assert record.total >= sum(record.stages.values())
+
+
+def test_timing_stats(test_file):
+    reset_timing_stats()
+    image_to_string(test_file)
+    with pytest.raises(RuntimeError):
+        image_to_string(test_file, timeout=0.000000001)
+
+    stats = get_timing_stats()
+    assert (stats['calls'], stats['errors']) == (2, 1)
+    assert stats['stages']['total']['count'] == 2
+    assert sum(count for _, count in stats['stages']['wait']['histogram'])
+
+
+@pytest.fixture
+def max_processes():
+    yield set_max_processes
+    set_max_processes(None)
+
+
+def test_max_processes(max_processes, test_file):
+    max_processes(1, queue_timeout=0.000000001)
+    with ThreadPoolExecutor(2) as executor:
+        with pytest.raises(TesseractQueueTimeout):
+            for _ in executor.map(image_to_string, [test_file] * 4):
+                pass
+
+    stats = get_admission_stats()
+    assert stats['max_processes'] == 1
+    assert stats['timeouts'] >= 1
+    assert stats['running'] == stats['queued'] == 0
+
+
+def test_max_processes_thread_limit(max_processes, monkeypatch):
+    monkeypatch.delenv('OMP_THREAD_LIMIT', raising=False)
+    assert 'OMP_THREAD_LIMIT' not in subprocess_args()['env']
+
+    max_processes(cpu_count() or 1)
+    assert subprocess_args()['env']['OMP_THREAD_LIMIT'] == '1'
+
+    monkeypatch.setenv('OMP_THREAD_LIMIT', '3')
+    assert subprocess_args()['env']['OMP_THREAD_LIMIT'] == '3'
+
+
+def test_ocr_best_of(test_file):
+    candidates = [('--psm 6', 'eng'), {'config': '--psm 3', 'lang': 'eng'}]
+    expected = {
+        image_to_string(test_file, 'eng', '--psm 6'),
+        image_to_string(test_file, 'eng', '--psm 3'),
+    }
+
+    best = ocr_best_of(Image.open(test_file), candidates, deadline=60)
+    assert {output for _, output, _ in best.results} == expected
+    assert best.score == max(score for _, _, score in best.results)
+    assert not best.errors
+
+    best = ocr_best_of(test_file, candidates, scorer=lambda output: 0)
+    assert best.candidate == {'config': '--psm 6', 'lang': 'eng'}
+
+
+def test_best_of_tie():
+    # results come in completion order, ties go to the first candidate
+    best = BestOf()
+    best.add('--psm 3', 'b', 1, 1)
+    best.add('--psm 6', 'a', 1, 0)
+    best.add('--psm 11', 'c', 1, 2)
+    assert (best.candidate, best.output) == ('--psm 6', 'a')
+
+
+def test_ocr_best_of_threshold(test_file):
+    candidates = [('--psm 6', 'eng'), ('--psm 3', 'eng'), ('--psm 11', 'eng')]
+    best = ocr_best_of(test_file, candidates, threshold=0, max_workers=1)
+    assert best.candidate == {'config': '--psm 6', 'lang': 'eng'}
+    assert best.cancelled
+    assert len(best.results) + len(best.cancelled) == len(candidates)
+    assert not best.errors
+
+
+def test_ocr_best_of_extensions(test_file):
+    best = ocr_best_of(
+        test_file,
+        [('--psm 6', 'eng'), ('--psm 3', 'eng')],
+        extension=['txt', 'tsv'],
+        scorer=lambda outputs: len(outputs[0]),
+    )
+    assert len(best.results) == 2
+    text, tsv = best.output
+    config = best.candidate['config']
+    assert text == image_to_string(test_file, 'eng', config)
+    assert tsv == image_to_data(test_file, 'eng', config)
+
+
+def test_ocr_best_of_deadline(test_file):
+    with pytest.raises(RuntimeError):
+        ocr_best_of(test_file, [('--psm 6', 'eng')], deadline=0.000000001)
+
+
 def test_image_to_string_timeout(test_file):
     with pytest.raises(RuntimeError):
         image_to_string(test_file, timeout=0.000000001)
 
 
+def test_aimage_to_string(test_file):
+    async def run():
+        return await asyncio.gather(
+            aimage_to_string(test_file, 'eng'),
+            aimage_to_string(Image.open(test_file), 'eng'),
+            aimage_to_data(test_file, output_type=Output.DICT),
+        )
+
+    text, image_text, data = asyncio.run(run())
+    assert text == image_text == image_to_string(test_file, 'eng')
+    assert data == image_to_data(test_file, output_type=Output.DICT)
+
+
+def test_aimage_to_string_timeout(test_file):
+    with pytest.raises(RuntimeError):
+        asyncio.run(aimage_to_string(test_file, timeout=0.000000001))
+
+
+def test_aimage_to_string_cancel(test_file):
+    async def run():
+        async def communicate(input_data):
+            await asyncio.sleep(10)
+
+        with mock.patch(
+            'asyncio.create_subprocess_exec',
+            new_callable=mock.AsyncMock,
+        ) as exec_mock:
+            proc = mock.Mock(
+                communicate=communicate,
+                wait=mock.AsyncMock(return_value=-9),
+            )
+            exec_mock.return_value = proc
+            task = asyncio.create_task(aimage_to_string(test_file))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            proc.kill.assert_called_once_with()
+            proc.wait.assert_awaited_once_with()
+            assert get_admission_stats()['running'] == 0
+
+    asyncio.run(run())
+
+
 def test_la_image_to_string():
     filepath = path.join(DATA_DIR, 'test_la.png')
     img = Image.open(filepath)
@@ -220,6 +765,43 @@ def test_image_to_osd(test_file):
         assert key + ':' in result
 
 
+def test_auto_rotate(test_file):
+    from PIL import Image
+
+    from pytesseract.orientation import osd_thumbnail
+
+    thumbnail = osd_thumbnail(test_file, max_side=320)
+    assert thumbnail.mode == 'L' and max(thumbnail.size) <= 320
+
+    image, osd = auto_rotate(test_file, max_side=320)
+    assert osd['script'] == 'Latin'
+    with Image.open(test_file) as original:
+        size = original.size
+    if osd['rotate'] in (90, 270):
+        assert image.size == size[::-1]
+    elif osd['rotate'] == 0:
+        assert image == test_file
+
+
+@pytest.mark.parametrize('degrees', [0, 90, 180, 270])
+def test_rotate(degrees):
+    from PIL import Image
+
+    from pytesseract.orientation import rotate
+
+    image = Image.new('L', (3, 2))
+    image.putpixel((0, 0), 255)
+    # the white top left corner, turned clockwise
+    corner = {0: (0, 0), 90: (1, 0), 180: (2, 1), 270: (0, 2)}[degrees]
+    assert rotate(image, degrees).getpixel(corner) == 255
+    if numpy_installed:
+        import numpy as np
+
+        array = rotate(np.asarray(image), degrees)
+        assert array.flags['C_CONTIGUOUS']
+        assert array[corner[1], corner[0]] == 255
+
+
 @pytest.mark.parametrize('extension', ['pdf', 'hocr'])
 def test_image_to_pdf_or_hocr(test_file, extension):
     result = image_to_pdf_or_hocr(test_file, extension=extension)
@@ -243,6 +825,89 @@ def test_image_to_pdf_or_hocr(test_file, extension):
         assert result.endswith('</html>')
 
 
+def test_image_to_pdf_or_hocr_words(test_file):
+    (page,) = image_to_pdf_or_hocr(
+        test_file,
+        extension='hocr',
+        output_type=Output.WORDS,
+    )
+    assert page.page_num == 1
+    assert page.words
+    assert page.text.split() == [word.text for word in page.words]
+    for word in page.words:
+        assert len(word.bbox) == 4
+
+    with pytest.raises(ValueError):
+        image_to_pdf_or_hocr(test_file, output_type=Output.WORDS)
+
+
+HOCR = b"""<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><body>
+<div class='ocr_page' id='page_1' title='image "a;b.png"; bbox 0 0 640 480'>
+ <div class='ocr_carea' id='block_1_1' title="bbox 36 92 618 160">
+  <p class='ocr_par' id='par_1_1' title="bbox 36 92 618 160">
+   <span class='ocr_line' title="bbox 36 92 580 122; baseline 0 -6">
+    <span class='ocrx_word' title='bbox 36 92 96 116; x_wconf 93'>This</span>
+    <span class='ocrx_word' title='bbox 109 92 129 116; x_wconf 96'
+     ><strong>is</strong></span>
+   </span>
+   <span class='ocr_line' id='line_1_2' title="bbox 36 130 96 160">
+    <span class='ocrx_word' title='bbox 36 130 96 156; x_wconf 90'
+     >R&amp;D</span>
+   </span>
+  </p>
+ </div>
+ <div class='ocr_carea' id='block_1_2' title="bbox 36 200 96 230">
+  <span class='ocr_line' id='line_1_3' title="bbox 36 200 96 230">
+   <span class='ocrx_word' title='bbox 36 200 96 226; x_wconf 88'>end</span>
+  </span>
+ </div>
+</div>
+</body></html>
+"""
+
+ALTO = b"""<?xml version="1.0" encoding="UTF-8"?>
+<alto xmlns="http://www.loc.gov/standards/alto/ns-v3#"><Layout>
+<Page WIDTH="640" HEIGHT="480" PHYSICAL_IMG_NR="0" ID="page_0">
+ <PrintSpace HPOS="0" VPOS="0" WIDTH="640" HEIGHT="480">
+  <TextBlock ID="block_0" HPOS="36" VPOS="92" WIDTH="582" HEIGHT="30">
+   <TextLine ID="line_0" HPOS="36" VPOS="92" WIDTH="544" HEIGHT="30">
+    <String HPOS="36" VPOS="92" WIDTH="60" HEIGHT="24" WC="0.93"
+     CONTENT="This"/><SP WIDTH="13" VPOS="92" HPOS="96"/>
+    <String HPOS="109" VPOS="92" WIDTH="20" HEIGHT="24" WC="0.96"
+     CONTENT="is"/>
+   </TextLine>
+  </TextBlock>
+ </PrintSpace>
+</Page>
+</Layout></alto>
+"""
+
+
+def test_parse_hocr():
+    (page,) = parse_hocr(HOCR)
+    assert page.bbox == (0, 0, 640, 480)
+    assert page.text == 'This is\nR&D\n\nend'
+    assert [block.text for block in page.blocks] == ['This is\nR&D', 'end']
+    assert [line.text for line in page.lines] == ['This is', 'R&D', 'end']
+    assert page.lines[0].baseline == (0, -6)
+
+    word = page.words[1]
+    assert (word.text, word.bbox, word.conf) == ('is', (109, 92, 129, 116), 96)
+    assert page.text[word.start : word.end] == 'is'
+
+
+def test_parse_alto():
+    (page,) = parse_alto(ALTO)
+    assert page.bbox == (0, 0, 640, 480)
+    assert page.text == 'This is'
+    assert [word.bbox for word in page.words] == [
+        (36, 92, 96, 116),
+        (109, 92, 129, 116),
+    ]
+    assert page.words[0].conf == pytest.approx(93)
+
+
 @pytest.mark.parametrize(
     'extensions',
     [
@@ -270,6 +935,16 @@ def test_run_and_get_multiple_output(test_file, function_mapping, extensions):
             assert result == function_mapping[extension](test_file)
 
 
+def test_run_and_get_multiple_output_config(test_file):
+    text, tsv = run_and_get_multiple_output(
+        test_file,
+        extensions=['txt', 'tsv'],
+        config='--psm 6',
+    )
+    assert text == image_to_string(test_file, config='--psm 6')
+    assert tsv == image_to_data(test_file, config='--psm 6')
+
+
 @pytest.mark.skipif(
     TESSERACT_VERSION[:2] < (4, 1),
     reason='requires tesseract >= 4.1',
@@ -369,6 +1044,19 @@ def test_image_to_data_common_output(test_file_small, output):
             assert key in result
 
 
+@pytest.mark.skipif(
+    TESSERACT_VERSION[:2] < (3, 5),
+    reason='requires tesseract >= 3.05',
+)
+@pytest.mark.skipif(numpy_installed is False, reason='requires numpy')
+def test_image_to_data_numpy_output(test_file_small):
+    result = image_to_data(test_file_small, output_type=Output.NUMPY)
+    expected = image_to_data(test_file_small, output_type=Output.DICT)
+    assert list(result.dtype.names) == list(expected)
+    for name in result.dtype.names:
+        assert result[name].tolist() == expected[name]
+
+
 @pytest.mark.parametrize('obj', [1, 1.0, None], ids=['int', 'float', 'none'])
 def test_wrong_prepare_type(obj):
     with pytest.raises(TypeError):
@@ -429,6 +1117,36 @@ def test_main_not_found_cases(
     assert 'Usage: pytesseract [-l lang] input_file' in capsys.readouterr().err
 
 
+def test_main_batch(capsys, monkeypatch, tmpdir, test_file):
+    """Test the batch mode and resuming it from its manifest."""
+    import json
+
+    import pytesseract
+
+    manifest = str(tmpdir.join('manifest.txt'))
+    argv = ['', '--batch', '-j', '2', '-m', manifest]
+    monkeypatch.setattr('sys.argv', argv + [test_file, test_file])
+    assert pytesseract.pytesseract.main() == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    result = json.loads(lines[0])
+    assert result['path'] == test_file
+    assert 'The quick brown dog' in result['text']
+    assert result['error'] is None
+    assert set(result['stages']) >= {'spawn', 'wait'}
+
+    # the manifest lists the finished inputs, which are skipped next time
+    with open(manifest) as f:
+        assert f.read() == path.abspath(test_file) + '\n'
+    missing = str(tmpdir.join('missing.png'))
+    monkeypatch.setattr('sys.argv', argv + [test_file, missing])
+    assert pytesseract.pytesseract.main() == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])['path'] == missing
+    assert json.loads(lines[0])['error']
+
+
 @pytest.mark.parametrize(
     'test_path',
     [path.sep + r'wrong_tesseract', r''],
@@ -484,12 +1202,45 @@ def test_get_languages(test_config, expected):
         (('', ' ', 0), {}),
         (('\n', '\n', 0), {}),
         (('header1 header2 header3\n', '\t', 0), {}),
+        (
+            ('level\tconf\ttext\n1\t-1\t\n5\t96.5\tThis', '\t', -1),
+            {'level': [1, 5], 'conf': [-1, 96], 'text': ['', 'This']},
+        ),
+        (
+            ('a\tb\tc\n1\tnan\tx\n2\t3', '\t', -1),
+            {'a': [1, 2], 'b': ['nan', 3], 'c': ['x', '']},
+        ),
+        (
+            ('a\tb\tc\n1\t2\tx\n3', '\t', -1),
+            {'a': [1, 3], 'b': [2, ''], 'c': ['x']},
+        ),
+        (
+            ('char left bottom right top page\nT 1 2 3 4 0', ' ', 0),
+            {
+                'char': ['T'],
+                'left': [1],
+                'bottom': [2],
+                'right': [3],
+                'top': [4],
+                'page': [0],
+            },
+        ),
     ),
 )
 def test_file_to_dict(input_args, expected):
     assert file_to_dict(*input_args) == expected
 
 
+@pytest.mark.skipif(numpy_installed is False, reason='requires numpy')
+def test_file_to_ndarray():
+    tsv = 'level\tconf\ttext\n1\t-1\t\n5\t96.5\tThis'
+    result = file_to_ndarray(tsv, '\t', -1)
+    assert result.dtype.names == ('level', 'conf', 'text')
+    assert result['level'].dtype == np.int32
+    assert result['conf'].tolist() == [-1, 96]
+    assert result['text'].tolist() == ['', 'This']
+
+
 @pytest.mark.parametrize(
     ('tesseract_version', 'expected'),
     (
@@ -504,6 +1255,45 @@ def test_get_tesseract_version(tesseract_version, expected):
         assert get_tesseract_version.__wrapped__().public == expected
 
 
+def test_get_tesseract_version_probe_cache(monkeypatch, tmpdir):
+    def reset():
+        monkeypatch.setattr(
+            get_tesseract_version,
+            '_result',
+            get_tesseract_version,
+        )
+
+    monkeypatch.setattr('pytesseract.pytesseract.probe_cache_dir', str(tmpdir))
+    reset()
+    version = get_tesseract_version(cached=True)
+    assert tmpdir.join('probes.json').check()
+
+    reset()
+    with mock.patch('subprocess.check_output', spec=True) as output_mock:
+        assert get_tesseract_version(cached=True) == version
+        output_mock.assert_not_called()
+
+
+def test_get_languages_not_cached_on_disk(monkeypatch, tmpdir):
+    monkeypatch.setattr('pytesseract.pytesseract.probe_cache_dir', str(tmpdir))
+    monkeypatch.setattr(get_languages, '_result', get_languages)
+    assert get_languages(cached=True) == get_languages()
+    assert not tmpdir.join('probes.json').check()
+
+
+def test_lazy_imports():
+    code = (
+        'import sys, pytesseract; '
+        'print("numpy" in sys.modules, "pandas" in sys.modules)'
+    )
+    result = subprocess.run(
+        [executable, '-c', code],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert result.stdout.split() == [b'False', b'False']
+
+
 @pytest.mark.parametrize(
     ('tesseract_version', 'expected_msg'),
     (